@@ -4,17 +4,7 @@
 import csv
 import sys
 
-
-def create_uri(id: str, url: str) -> str:
-    if "argenprop" in url:
-        site = "site1"
-    elif "mercadolibre" in url:
-        site = "site2"
-    else:
-        site = "site3"
-
-    return f"https://raw.githubusercontent.com/fdioguardi/pronto/main/ontology/pronto.owl#listing_{site}_{id}"
-
+from uris import create_uri
 
 
 try:
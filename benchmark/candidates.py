@@ -0,0 +1,255 @@
+"""
+Find the candidate duplicates among the listings of a CSV.
+
+Instead of comparing every pair of listings, the listings are grouped in
+blocks by a few keys (location and property type, plus a rounded price,
+a rounded surface or a cell of a coordinates grid), and only the
+listings of the same block are compared. The blocks are compared in
+worker processes, and the pairs scoring at least the threshold are
+written in the format of the Duke results: `+,uri1,uri2,score`.
+"""
+
+
+import argparse
+import csv
+import itertools
+import math
+import multiprocessing
+import os
+import sys
+import time
+
+from uris import create_uri
+
+BLOCKS_PER_TASK = 256
+
+# weight of each field in the score of a pair
+WEIGHTS: dict[str, float] = {"price": 0.35, "surface": 0.3, "distance": 0.25, "rooms": 0.1}
+
+# width of the buckets of the logarithms of prices and surfaces, so that
+# values within about 10% of each other share a bucket
+LOG_WIDTH = 0.2
+
+# fields two listings must have in common to be compared
+MIN_FIELDS = 2
+
+# distance at which the coordinates stop adding to the score, in meters
+MAX_DISTANCE = 500
+
+# the listings of the worker processes, and the keys of the blocks left
+# out for being too big, inherited when they are forked
+_listings: list[tuple] = []
+_skipped: set[tuple] = set()
+
+
+def number(value: str) -> float | None:
+    "Return `value` as a positive float, or None if it isn't one."
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if value > 0 and math.isfinite(value) else None
+
+
+def number_or_none(value: str) -> float | None:
+    "Return `value` as a float, or None if it isn't one."
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return value if math.isfinite(value) else None
+
+
+def listing(row: dict, cell: float) -> tuple:
+    """
+    Return the uri, the fields compared and the blocking keys of `row`.
+
+    Every listing has a key per pass: its location and property type,
+    followed by the bucket of the logarithm of its price, the bucket of
+    the logarithm of its surface, or its cell in a grid of `cell`
+    degrees. Each pass is done twice, with the buckets shifted by half
+    their width, so that close values always share a bucket in one of
+    them. A pass with a missing field has no key.
+    """
+    price = number(row.get("price"))
+    surface = number(row.get("total_surface")) or number(row.get("covered_surface"))
+    latitude, longitude = number_or_none(row.get("latitude")), number_or_none(row.get("longitude"))
+    rooms = number(row.get("room_amnt"))
+
+    place = (row.get("province", ""), row.get("district", ""), row.get("property_type", ""))
+    keys = []
+    for shift in (0, 0.5):
+        keys.append(
+            place + (row.get("currency", ""), bucket(math.log(price), LOG_WIDTH, shift))
+            if price else None
+        )
+        keys.append(place + (bucket(math.log(surface), LOG_WIDTH, shift),) if surface else None)
+        keys.append(
+            (row.get("property_type", ""), bucket(latitude, cell, shift), bucket(longitude, cell, shift))
+            if latitude is not None and longitude is not None else None
+        )
+    return (
+        create_uri(row["listing_id"], row.get("url", "")),
+        price, surface, latitude, longitude, rooms, tuple(keys),
+    )
+
+
+def bucket(value: float, width: float, shift: float) -> int:
+    "Return the bucket of `value` among buckets of `width` shifted by `shift` widths."
+    return math.floor(value / width + shift)
+
+
+def read_listings(source: str, cell: float) -> list[tuple]:
+    "Return the listings of `source` that have an id."
+    with open(source, newline="", encoding="utf-8") as f:
+        return [listing(row, cell) for row in csv.DictReader(f) if row.get("listing_id")]
+
+
+def blocks(listings: list[tuple], max_block: int) -> tuple[list[tuple[int, list[int]]], set[tuple]]:
+    """
+    Return the blocks of `listings` with more than one listing, as the
+    pass of the block and the positions of its listings, and the keys
+    (pass and key) of the blocks left out for being bigger than
+    `max_block`.
+    """
+    found: dict[tuple, list[int]] = {}
+    for i, item in enumerate(listings):
+        for p, key in enumerate(item[-1]):
+            if key is not None:
+                found.setdefault((p,) + key, []).append(i)
+
+    result, skipped = [], set()
+    for key, members in found.items():
+        if len(members) > max_block:
+            skipped.add(key)
+        elif len(members) > 1:
+            result.append((key[0], members))
+    return result, skipped
+
+
+def score(a: tuple, b: tuple) -> float:
+    """
+    Return the similarity of the listings `a` and `b`, between 0 and 1,
+    as the weighted average of the similarity of the fields both have,
+    or 0 if they have less than `MIN_FIELDS` in common.
+    """
+    total = weights = 0.0
+    fields = 0
+
+    for field, x, y in (("price", a[1], b[1]), ("surface", a[2], b[2]), ("rooms", a[5], b[5])):
+        if x and y:
+            weight = WEIGHTS[field]
+            total += weight * (min(x, y) / max(x, y) if field != "rooms" else float(x == y))
+            weights += weight
+            fields += 1
+
+    if None not in (a[3], a[4], b[3], b[4]):
+        weight = WEIGHTS["distance"]
+        total += weight * max(0.0, 1 - distance(a[3], a[4], b[3], b[4]) / MAX_DISTANCE)
+        weights += weight
+        fields += 1
+
+    return total / weights if fields >= MIN_FIELDS else 0.0
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    "Return the approximate distance between two coordinates, in meters."
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6_371_000 * math.hypot(x, y)
+
+
+def compare(task: tuple[list[tuple[int, list[int]]], float]) -> tuple[list[tuple], int]:
+    """
+    Compare the listings of every block of the task, returning the pairs
+    scoring at least the threshold and the number of comparisons.
+
+    A pair sharing the keys of several passes is only compared in the
+    block of the first one that wasn't left out, so that it is found
+    once.
+    """
+    task_blocks, threshold = task
+    pairs, comparisons = [], 0
+    for p, members in task_blocks:
+        for i, j in itertools.combinations(members, 2):
+            a, b = _listings[i], _listings[j]
+            if any(
+                a[-1][q] is not None and a[-1][q] == b[-1][q] and (q,) + a[-1][q] not in _skipped
+                for q in range(p)
+            ):
+                continue
+            comparisons += 1
+            similarity = score(a, b)
+            if similarity >= threshold:
+                pairs.append(("+", a[0], b[0], round(similarity, 3)))
+    return pairs, comparisons
+
+
+def _init(listings: list[tuple], skipped: set[tuple]) -> None:
+    global _listings, _skipped
+    _listings, _skipped = listings, skipped
+
+
+def main() -> None:
+    args = parse_args()
+    start = time.perf_counter()
+
+    listings = read_listings(args.source, args.cell)
+    found, skipped = blocks(listings, args.max_block)
+    # the biggest blocks first, so they don't end up alone in the last task
+    found.sort(key=lambda block: len(block[1]), reverse=True)
+    tasks = (
+        (found[i : i + BLOCKS_PER_TASK], args.threshold)
+        for i in range(0, len(found), BLOCKS_PER_TASK)
+    )
+
+    jobs = os.cpu_count() if args.jobs < 0 else args.jobs
+    context = multiprocessing.get_context("fork")
+    comparisons = written = 0
+    with (
+        context.Pool(jobs, initializer=_init, initargs=(listings, skipped)) as pool,
+        open(args.destination, "w", newline="") as f,
+    ):
+        writer = csv.writer(f)
+        for pairs, compared in pool.imap_unordered(compare, tasks):
+            writer.writerows(pairs)
+            comparisons += compared
+            written += len(pairs)
+
+    all_pairs = len(listings) * (len(listings) - 1) // 2
+    print(
+        f"Compared {comparisons} of {all_pairs} pairs of {len(listings)} listings "
+        f"in {len(found)} blocks ({len(skipped)} blocks over {args.max_block} left out), "
+        f"found {written} candidates in {time.perf_counter() - start:.1f}s",
+        file=sys.stderr,
+    )
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+
+    parser.add_argument("--source", help="CSV of listings", default="data/data.csv")
+    parser.add_argument(
+        "--destination", help="CSV of candidate pairs to write", default="data/candidates.csv"
+    )
+    parser.add_argument(
+        "--threshold", help="Minimum score of a candidate pair", type=float, default=0.9
+    )
+    parser.add_argument(
+        "--cell", help="Size of the cells of the coordinates grid, in degrees",
+        type=float, default=0.005,
+    )
+    parser.add_argument(
+        "--max-block", help="Blocks with more listings than this aren't compared",
+        type=int, default=1000,
+    )
+    parser.add_argument(
+        "-j", "--jobs", help="Number of worker processes (-1 uses every core)",
+        type=int, default=-1,
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Measure the throughput of csv2pronto on synthetic listings.
+
+Every combination of size, mode and format is converted in its own
+process, and the rows/sec, triples/sec, peak RSS and output size of each
+run are written to a JSON report.
+"""
+
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from generate_listings import generate
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CSV2PRONTO = os.path.join(ROOT, "csv2pronto")
+ONTOLOGY = os.path.join(ROOT, "ontology", "pronto.owl")
+
+MODES: dict[str, list[str]] = {
+    "row": ["--engine", "row", "--stream"],
+    "batch": ["--stream"],
+    "full": [],
+    "sorted": ["--store", "sorted"],
+    "parallel": ["--stream", "--jobs", str(os.cpu_count())],
+}
+
+STREAM_FORMATS = {"nt", "ttl"}
+SORTED_FORMATS = {"nt"}
+
+
+def supported(mode: str, format: str) -> bool:
+    "Return whether csv2pronto can convert to `format` in `mode`."
+    if mode == "sorted":
+        return format in SORTED_FORMATS
+    if "--stream" in MODES[mode]:
+        return format in STREAM_FORMATS
+    return True
+
+
+def run(source: str, destination: str, mode: str, format: str) -> dict:
+    "Convert `source` and return the measures of the run."
+    command = [
+        sys.executable, CSV2PRONTO, "-s", source, "-d", destination,
+        "-o", ONTOLOGY, "-f", format, *MODES[mode],
+    ]
+
+    start = time.perf_counter()
+    process = subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr = process.stderr.read().decode()
+    _, status, usage = os.wait4(process.pid, 0)
+    seconds = time.perf_counter() - start
+
+    if status != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{stderr}")
+
+    summary = re.search(r"Converted (\d+) rows into (\d+) triples", stderr)
+    rows, triples = int(summary[1]), int(summary[2])
+
+    return {
+        "seconds": round(seconds, 3),
+        "rows": rows,
+        "triples": triples,
+        "rows_per_sec": round(rows / seconds, 1),
+        "triples_per_sec": round(triples / seconds, 1),
+        # ru_maxrss is in KiB on Linux
+        "peak_rss_mb": round(usage.ru_maxrss / 1024, 1),
+        "output_bytes": os.path.getsize(destination),
+    }
+
+
+def main() -> None:
+    args = parse_args()
+    os.makedirs(args.workdir, exist_ok=True)
+    results = []
+
+    for size in args.sizes:
+        source = os.path.join(args.workdir, f"listings-{size}-{args.null_density}.csv")
+        if not os.path.exists(source):
+            generate(size, source, args.null_density, args.seed)
+
+        for mode in args.modes:
+            for format in args.formats:
+                if not supported(mode, format):
+                    continue
+
+                destination = os.path.join(args.workdir, f"out-{size}-{mode}.{format}")
+                result = {
+                    "size": size,
+                    "null_density": args.null_density,
+                    "mode": mode,
+                    "format": format,
+                    **run(source, destination, mode, format),
+                }
+                print(json.dumps(result))
+                results.append(result)
+                os.remove(destination)
+
+    with open(args.report, "w") as f:
+        json.dump(results, f, indent=2)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+
+    parser.add_argument(
+        "--sizes", help="Number of rows of each input", nargs="+", type=int,
+        default=[10_000, 100_000],
+    )
+    parser.add_argument(
+        "--null-density", help="Probability of an optional value being empty",
+        type=float, default=0.2,
+    )
+    parser.add_argument(
+        "--modes", help="Modes to run", nargs="+", choices=MODES, default=list(MODES)
+    )
+    parser.add_argument(
+        "--formats", help="Output formats", nargs="+", default=["nt", "ttl"]
+    )
+    parser.add_argument("--seed", help="Seed of the generator", type=int, default=0)
+    parser.add_argument(
+        "--workdir", help="Directory for the inputs and outputs", default="data/conversion"
+    )
+    parser.add_argument(
+        "--report", help="JSON report to write", default="data/conversion.json"
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""
+Evaluate files of duplicate pairs (`+,uri1,uri2,score`, like the Duke
+results or the output of candidates.py) against the labeled positives.
+
+The pairs of every file are parsed once into arrays of interned URI ids,
+which are cached next to the file, and the precision, recall and F1 of
+each threshold of the score column are computed over the arrays.
+"""
+
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+CACHE_VERSION = 1
+
+
+def load_pairs(path: str, cache: bool = True) -> dict[str, np.ndarray]:
+    """
+    Return the pairs of `path` as the array of its unique `uris`, the
+    positions in it of the `first` and `second` URI of each pair, the
+    `score` of each pair and whether it's a `match` (`+`) or not (`-`).
+
+    The arrays are saved to `path.npz`, and loaded from it instead of
+    parsing `path` again while `path` isn't modified.
+    """
+    cached = f"{path}.npz"
+    stat = os.stat(path)
+    if cache and os.path.exists(cached):
+        with np.load(cached) as data:
+            if data["source"].tolist() == [CACHE_VERSION, stat.st_size, stat.st_mtime_ns]:
+                return {k: data[k] for k in ("uris", "first", "second", "score", "match")}
+
+    df = pd.read_csv(
+        path, header=None, names=["sign", "first", "second", "score"],
+        dtype={"sign": str, "first": str, "second": str}, keep_default_na=False,
+    )
+    codes, uris = pd.factorize(pd.concat([df["first"], df["second"]], ignore_index=True))
+    pairs = {
+        "uris": uris.to_numpy(dtype=str),
+        "first": codes[: len(df)].astype(np.int32),
+        "second": codes[len(df) :].astype(np.int32),
+        "score": pd.to_numeric(df["score"], errors="coerce").fillna(0).to_numpy(np.float64),
+        "match": (df["sign"].str.strip() == "+").to_numpy(),
+    }
+
+    if cache:
+        # numpy adds the .npz extension unless it's already there
+        np.savez(
+            f"{cached}.tmp.npz", **pairs,
+            source=np.array([CACHE_VERSION, stat.st_size, stat.st_mtime_ns], dtype=np.int64),
+        )
+        os.replace(f"{cached}.tmp.npz", cached)
+    return pairs
+
+
+def pair_keys(pairs: dict[str, np.ndarray], vocabulary: pd.Index) -> np.ndarray:
+    """
+    Return an int64 key for each pair, the same regardless of the order
+    of its URIs, from their positions in `vocabulary`.
+    """
+    ids = vocabulary.get_indexer(pairs["uris"]).astype(np.int64)
+    first, second = ids[pairs["first"]], ids[pairs["second"]]
+    return np.minimum(first, second) * len(vocabulary) + np.maximum(first, second)
+
+
+def evaluate(results: dict, positives: dict, thresholds: np.ndarray) -> pd.DataFrame:
+    """
+    Return the number of pairs predicted and the true positives,
+    precision, recall and F1 of the matches of `results` scoring at
+    least each of `thresholds`, against the matches of `positives`.
+    """
+    vocabulary = pd.Index(np.union1d(results["uris"], positives["uris"]))
+    expected = np.unique(pair_keys(positives, vocabulary)[positives["match"]])
+
+    keys = pair_keys(results, vocabulary)[results["match"]]
+    scores = results["score"][results["match"]]
+    # a pair found several times counts once, with its best score
+    order = np.lexsort((-scores, keys))
+    keys, scores = keys[order], scores[order]
+    first = np.ones(len(keys), dtype=bool)
+    first[1:] = keys[1:] != keys[:-1]
+    keys, scores = keys[first], scores[first]
+
+    # the true positives among the pairs scoring at least each score
+    order = np.argsort(-scores, kind="stable")
+    scores = scores[order]
+    hits = np.cumsum(np.isin(keys[order], expected))
+    predicted = np.searchsorted(-scores, -thresholds, side="right")
+    true_positives = np.where(predicted > 0, hits[np.maximum(predicted - 1, 0)], 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(predicted > 0, true_positives / predicted, 0.0)
+        recall = true_positives / len(expected) if len(expected) else np.zeros(len(thresholds))
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+
+    return pd.DataFrame({
+        "threshold": thresholds,
+        "predicted": predicted,
+        "true_positives": true_positives,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+    })
+
+
+def main() -> None:
+    args = parse_args()
+    positives = load_pairs(args.positives, not args.no_cache)
+    thresholds = np.round(np.arange(args.sweep[0], args.sweep[1] + args.sweep[2] / 2, args.sweep[2]), 6)
+
+    report = {}
+    for path in args.results:
+        metrics = evaluate(load_pairs(path, not args.no_cache), positives, thresholds)
+        best = metrics.loc[metrics["f1"].idxmax()]
+        print(f"{path}: best F1 {best['f1']:.3f} at threshold {best['threshold']:g}", file=sys.stderr)
+        print(metrics.to_string(index=False, float_format="{:.3f}".format), file=sys.stderr)
+        report[path] = metrics.to_dict("records")
+
+    if args.report:
+        with open(args.report, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__)
+
+    parser.add_argument("results", help="CSVs of pairs to evaluate", nargs="+")
+    parser.add_argument(
+        "--positives", help="CSV of the labeled pairs", default="data/positivos.csv"
+    )
+    parser.add_argument(
+        "--sweep", help="First and last threshold, and the step between them",
+        nargs=3, type=float, metavar=("FIRST", "LAST", "STEP"), default=[0.0, 1.0, 0.05],
+    )
+    parser.add_argument("--report", help="JSON report to write")
+    parser.add_argument(
+        "--no-cache", help="Parse the CSVs instead of using the cached pairs",
+        action="store_true",
+    )
+
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Generate a synthetic CSV of listings with the columns csv2pronto reads.
+
+Usage: python generate_listings.py ROWS DESTINATION [NULL_DENSITY] [SEED]
+"""
+
+
+import csv
+import random
+import sys
+
+COLUMNS = [
+    "address", "advertiser_id", "advertiser_name", "age", "bath_amnt",
+    "bed_amnt", "bed_ratio", "covered_ratio", "covered_surface",
+    "covered_surface_unit", "currency", "date_extracted", "date_published",
+    "description", "disposition", "district", "features", "garage_amnt",
+    "is_finished_property", "is_new_property", "is_studio_apartment",
+    "land_ratio", "land_surface", "land_surface_unit", "latitude",
+    "listing_age", "listing_id", "longitude", "luminosity", "maintenance_fee",
+    "maintenance_fee_currency", "neighborhood", "orientation", "price",
+    "price_control", "property_group", "property_type", "province",
+    "reconstructed_land_surface", "reconstructed_land_surface_unit",
+    "reconstructed_total_surface", "reconstructed_total_surface_unit",
+    "response", "room_amnt", "room_ratio", "site", "site_abbreviation", "title",
+    "toilette_amnt", "total_ratio", "total_surface", "total_surface_unit",
+    "transaction", "uncovered_surface", "uncovered_surface_unit", "url",
+    "year_built",
+    # AVE columns
+    "direccion", "barrio", "date_ave", "esquina", "pileta", "loteo_ph",
+    "indiviso", "irregular", "es_monetizable", "a_demoler", "es_multioferta",
+    "preventa", "posesion",
+]
+
+REQUIRED = {"site", "district", "province", "date_extracted", "date_ave"}
+
+SITES = ["argenprop", "mercadolibre", "zonaprop"]
+LOCATIONS = {
+    "Buenos Aires": ["La Plata", "Berisso", "Ensenada", "Quilmes", "Tigre"],
+    "Córdoba": ["Córdoba", "Villa Carlos Paz", "Río Cuarto"],
+    "Santa Fe": ["Rosario", "Santa Fe", "Rafaela"],
+}
+NEIGHBORHOODS = ["Centro", "Norte", "Sur", "Barrio Jardín", "Villa Elvira"]
+PROPERTY_TYPES = ["casa", "departamento", "lote", "ph", "local"]
+DATES = [f"2024-05-{day:02}" for day in range(1, 29)]
+AVE_DATES = ["2024-06-01", "2024-06-15", "2024-07-01"]
+FEATURES = ["esquina", "pileta", "loteo_ph", "indiviso", "irregular",
+            "es_monetizable", "a_demoler", "es_multioferta", "preventa", "posesion"]
+
+
+def listing(i: int, rng: random.Random) -> dict:
+    "Return a listing with every column filled."
+    site = rng.choice(SITES)
+    province = rng.choice(list(LOCATIONS))
+    total = rng.randint(30, 600)
+    covered = rng.randint(20, total)
+
+    row = {
+        "address": f"Calle {rng.randint(1, 200)} {rng.randint(1, 3000)}",
+        "advertiser_id": str(rng.randint(1, 5000)),
+        "advertiser_name": f"Inmobiliaria {rng.randint(1, 5000)}",
+        "age": str(rng.randint(0, 80)),
+        "bath_amnt": str(rng.randint(1, 3)),
+        "bed_amnt": str(rng.randint(0, 5)),
+        "bed_ratio": f"{rng.random():.2f}",
+        "covered_ratio": f"{covered / total:.2f}",
+        "covered_surface": str(covered),
+        "covered_surface_unit": "m²",
+        "currency": rng.choice(["USD", "ARS"]),
+        "date_extracted": rng.choice(DATES),
+        "date_published": rng.choice(DATES),
+        "description": "Hermosa propiedad, \"luminosa\".\nExcelente ubicación. " * rng.randint(1, 8),
+        "disposition": rng.choice(["frente", "contrafrente", "interno"]),
+        "district": rng.choice(LOCATIONS[province]),
+        "features": "{'balcón': True, 'parrilla': True}",
+        "garage_amnt": str(rng.randint(0, 2)),
+        "is_finished_property": rng.choice(["True", "False"]),
+        "is_new_property": rng.choice(["True", "False"]),
+        "is_studio_apartment": rng.choice(["True", "False"]),
+        "land_ratio": f"{rng.random():.2f}",
+        "land_surface": str(total),
+        "land_surface_unit": "m²",
+        "latitude": f"{-34.9 + rng.random():.6f}",
+        "listing_age": str(rng.randint(0, 365)),
+        "listing_id": ("MLA" if site == "mercadolibre" else "") + str(10_000_000 + i),
+        "longitude": f"{-58.0 + rng.random():.6f}",
+        "luminosity": rng.choice(["muy luminoso", "luminoso"]),
+        "maintenance_fee": str(rng.randint(1000, 90000)),
+        "maintenance_fee_currency": "ARS",
+        "neighborhood": rng.choice(NEIGHBORHOODS),
+        "orientation": rng.choice(["norte", "sur", "este", "oeste"]),
+        "price": str(rng.randint(20_000, 900_000)),
+        "price_control": "",
+        "property_group": "residencial",
+        "property_type": rng.choice(PROPERTY_TYPES),
+        "province": province,
+        "reconstructed_land_surface": str(total),
+        "reconstructed_land_surface_unit": "m²",
+        "reconstructed_total_surface": str(total),
+        "reconstructed_total_surface_unit": "m²",
+        "response": "",
+        "room_amnt": str(rng.randint(1, 7)),
+        "room_ratio": f"{rng.random():.2f}",
+        "site": site,
+        "site_abbreviation": site[:2].upper(),
+        "title": f"{rng.choice(PROPERTY_TYPES).capitalize()} en venta {i}",
+        "toilette_amnt": str(rng.randint(0, 1)),
+        "total_ratio": f"{rng.random():.2f}",
+        "total_surface": str(total),
+        "total_surface_unit": "m²",
+        "transaction": rng.choice(["Venta", "Alquiler"]),
+        "uncovered_surface": str(total - covered),
+        "uncovered_surface_unit": "m²",
+        "url": f"https://www.{site}.com.ar/propiedad/{i}",
+        "year_built": str(rng.randint(1920, 2024)),
+        "direccion": f"Avenida {rng.randint(1, 60)} {rng.randint(1, 3000)}",
+        "barrio": rng.choice(NEIGHBORHOODS),
+        "date_ave": rng.choice(AVE_DATES),
+    }
+    for feature in FEATURES:
+        row[feature] = rng.choice(["True", "False"])
+    return row
+
+
+def generate(rows: int, destination: str, null_density: float = 0.2, seed: int = 0) -> None:
+    """
+    Write `rows` synthetic listings to `destination`, leaving each
+    optional value empty with probability `null_density`.
+    """
+    rng = random.Random(seed)
+    with open(destination, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for i in range(rows):
+            row = listing(i, rng)
+            writer.writerow(
+                "" if c not in REQUIRED and rng.random() < null_density else row[c]
+                for c in COLUMNS
+            )
+
+
+if __name__ == "__main__":
+    try:
+        rows = int(sys.argv[1])
+        destination = sys.argv[2]
+    except (IndexError, ValueError):
+        sys.exit(__doc__)
+
+    try:
+        null_density = float(sys.argv[3])
+    except IndexError:
+        null_density = 0.2
+
+    try:
+        seed = int(sys.argv[4])
+    except IndexError:
+        seed = 0
+
+    generate(rows, destination, null_density, seed)
@@ -0,0 +1,12 @@
+"URIs of the listings, as the converter names them."
+
+
+def create_uri(id: str, url: str) -> str:
+    if "argenprop" in url:
+        site = "site1"
+    elif "mercadolibre" in url:
+        site = "site2"
+    else:
+        site = "site3"
+
+    return f"https://raw.githubusercontent.com/fdioguardi/pronto/main/ontology/pronto.owl#listing_{site}_{id}"
@@ -1,27 +1,315 @@
 """ Convert a CSV file to an RDF graph following the Pronto ontology """
 
+import time
+
+STARTED = time.perf_counter()
+
+# pandas and joblib are imported only when the run needs them, as
+# importing them takes longer than converting a small file
 import argparse
 import csv
-import pandas as pd
+import hashlib
 import itertools
-import rdflib
-from src.converter import create_graph_from_chunk
+import os
+import sys
+import tempfile
+from collections import Counter, defaultdict
+from src.checkpoints.checkpoints import Checkpoint, RecordOffsets
+from src.converter import (
+    cache_stats, convert_chunk, create_graph_from_chunk, fresh_shared, remember_shared, restore_shared,
+    write_chunk,
+)
+from src.delta.delta import DeltaIndex
+from src.dates.dates import set_iso_fast_path
+from src.incrementals import incrementals
+from src.incrementals.incrementals import FALLBACK_IDS, RUN_ID, Incremental, set_shard
+from src.ontology.ontology import CACHE_DIR, load_ontology
+from src.profiling import profiling
+from src.profiling.profiling import profiled_iter, stage
+from src.records.records import CATEGORICAL, COLUMNS
+from src.spatial.spatial import SpatialIndex
+from src.writers.writers import (
+    COMPRESSIONS, LINE_FORMATS, STORES, STREAM_FORMATS, StreamWriter, open_graph, writer_factory,
+)
 from tqdm import tqdm
-from joblib import Parallel, delayed
 
 def main() -> None:
     args: argparse.Namespace = parse_args()
+
+    set_iso_fast_path(not args.no_iso_fast_path)
+    profiling.set_profiling(args.profile)
+    profiling.record("startup", time.perf_counter() - STARTED)
+    incrementals.configure(args.fallback_ids, args.run_id or run_id(args.source))
+    stats: Counter = Counter()
+
+    checkpoint: Checkpoint | None = None
+    checkpoint_path = f"{args.destination}.checkpoint.json"
+    if args.resume and os.path.exists(checkpoint_path):
+        checkpoint = Checkpoint.load(checkpoint_path, args.source, args.destination)
+        Incremental.restore(checkpoint.incrementals)
+    elif args.checkpoint or args.resume:
+        checkpoint = Checkpoint(checkpoint_path, args.source, args.destination)
+    resume = checkpoint.writer if checkpoint and checkpoint.offset is not None else None
     
-    with open(args.source, "r", encoding="utf-8") as csv_file:
-        graph: rdflib.Graph = rdflib.Graph()
+    with open(args.source, "r", encoding="utf-8") as csv_file, \
+            tempfile.TemporaryDirectory(dir=args.store_dir, prefix="csv2pronto-") as store_dir:
+        ontology = load_ontology(args.ontology, None if args.no_ontology_cache else CACHE_DIR)
 
-        graph.parse(args.ontology)
+        graph = open_graph(args.store, store_dir)
+        for prefix, namespace in ontology.namespaces():
+            graph.bind(prefix, namespace, replace=True)
+        if not args.no_ontology_output:
+            graph += ontology
+            for triple in ontology:
+                remember_shared(triple)
        
-        chunksize = 3000
+        # the fallback ids and the delta index hash every column of the rows
+        columns = None if args.delta or args.fallback_ids == "hash" else set(COLUMNS)
+        chunks = read_chunks(
+            csv_file, args.chunksize, checkpoint, args.reader, columns, args.categorical
+        )
+        first = checkpoint.chunk + 1 if checkpoint else 0
+        offsets = RecordOffsets(args.source, checkpoint.offset) if checkpoint else None
+
+        delta = DeltaIndex(args.delta) if args.delta else None
+        if delta:
+            chunks = (delta.filter(chunk) for chunk in chunks)
+        spatial = SpatialIndex(args.spatial_index) if args.spatial_index else None
+        if spatial:
+            chunks = (spatial.add(chunk) for chunk in chunks)
+
+        def written(idx: int, rows: int) -> None:
+            """Save the progress once the chunk `idx`, with `rows` rows, is written."""
+            if delta:
+                rows = delta.written()
+            writer.written(rows)
+            if checkpoint:
+                save_checkpoint(checkpoint, offsets, writer, idx, rows)
+            if delta:
+                # after the checkpoint, as a resumed run converts again the
+                # chunks written after it
+                delta.commit()
+
+        with writer_factory(
+            graph, args.destination, args.format, args.stream, args.store, store_dir, resume,
+            args.native, args.compression, args.shard_rows, args.shard_bytes,
+        ) as writer:
+            if resume is not None and isinstance(writer, StreamWriter):
+                # the stream writers only remember the last triples they wrote
+                restore_shared(args.destination, writer.format)
+            if args.pipeline:
+                # Overlap reading, converting and writing the chunks
+                from src.pipeline.pipeline import run_pipeline
+
+                def converted(idx: int, chunk_stats: Counter) -> None:
+                    stats.update(chunk_stats)
+                    written(idx, chunk_stats["rows"])
+
+                with tqdm(unit="chunk") as progress:
+                    run_pipeline(
+                        chunks, first, writer, converted, args.engine, args.jobs,
+                        args.queue_size, args.profile, progress, not args.native,
+                    )
+            elif args.jobs == 1:
+                chunks = profiled_iter("read", chunks, triples=False)
+                for idx, row in enumerate(tqdm(chunks, unit="chunk"), start=first):
+                    # Process each chunk sequentially
+                    set_shard(idx)
+                    if args.native:
+                        write_chunk(row, writer, args.engine)
+                    else:
+                        create_graph_from_chunk(row, writer, args.engine)
+                    stats.update(chunks=1, rows=len(row))
+                    written(idx, len(row))
+            else:
+                # Convert the chunks in worker processes, writing them in order
+                with stage("import"):
+                    from joblib import Parallel, delayed
+                results = Parallel(n_jobs=args.jobs, return_as="generator")(
+                    delayed(convert_chunk)(
+                        row, idx, args.engine, args.profile, incrementals.settings(), not args.native
+                    )
+                    for idx, row in enumerate(chunks, start=first)
+                )
+                for idx, (triples, shared, chunk_stats) in enumerate(tqdm(results, unit="chunk"), start=first):
+                    with stage("serialize"):
+                        writer.write(itertools.chain(fresh_shared(shared), triples))
+                    stats += chunk_stats
+                    written(idx, chunk_stats["rows"])
+
+        if offsets:
+            offsets.close()
+        if delta:
+            stats += delta.stats
+            delta.close()
+        if spatial:
+            spatial.close()
+        # once closed, as the sorted runs are only merged then
+        stats["triples"] = writer.triples
+
+    if checkpoint:
+        checkpoint.remove()
+
+    stats += cache_stats()
+    print_summary(stats)
+    if args.profile:
+        profiling.dump(stats + profiling.stats(), f"{args.destination}.profile.json")
+
+
+def run_id(source: str) -> str:
+    """Return the default run id of the conversion of `source`: a hash of its name."""
+    return hashlib.blake2b(os.path.basename(source).encode(), digest_size=4).hexdigest()
+
+
+def read_chunks(
+    csv_file,
+    chunksize: int,
+    checkpoint: Checkpoint | None,
+    reader: str = "pandas",
+    columns: set[str] | None = None,
+    categorical: bool = False,
+):
+    """
+    Return an iterator over the chunks of `csv_file`, starting after the
+    last chunk saved in `checkpoint`.
+
+    The chunks are DataFrames read by pandas or pyarrow, or lists of rows
+    read by the csv module if `reader` is "csv". Only the `columns` given
+    are read, and the `CATEGORICAL` ones of the DataFrames are read as
+    categories if `categorical` is set.
+    """
+    if reader == "csv":
+        return read_csv_chunks(csv_file, chunksize, checkpoint, columns)
+    if reader == "pyarrow":
+        return read_arrow_chunks(csv_file, chunksize, checkpoint, columns, categorical)
+
+    with stage("import"):
+        import pandas as pd
+
+    dtype = defaultdict(lambda: str, dict.fromkeys(CATEGORICAL, "category")) if categorical else str
+    options = dict(chunksize=chunksize, iterator=True, dialect='excel', delimiter=",", keep_default_na=False, dtype=dtype)
+    if columns is not None:
+        options["usecols"] = lambda name: name in columns
+
+    if checkpoint is None or checkpoint.offset is None:
+        return pd.read_csv(csv_file, **options)
+
+    names = pd.read_csv(csv_file, nrows=0, dialect='excel', delimiter=",", dtype=str).columns
+    csv_file.seek(checkpoint.offset)
+    return pd.read_csv(csv_file, header=None, names=names, **options)
+
+
+def read_csv_chunks(csv_file, chunksize: int, checkpoint: Checkpoint | None, columns: set[str] | None = None):
+    """
+    Yield the chunks of `csv_file` as lists of rows, read with the csv
+    module the same way `read_chunks` reads them with pandas.
+    """
+    options = dict(dialect="excel", delimiter=",")
+
+    rows = csv.reader(csv_file, **options)
+    names = next(rows)
+    if checkpoint is not None and checkpoint.offset is not None:
+        csv_file.seek(checkpoint.offset)
+        rows = csv.reader(csv_file, **options)
+
+    # like csv.DictReader, skipping the blank lines and filling the short rows with ""
+    fields = [(i, name) for i, name in enumerate(names) if columns is None or name in columns]
+    records = (
+        {name: row[i] if i < len(row) else "" for i, name in fields} for row in rows if row
+    )
+    while chunk := list(itertools.islice(records, chunksize)):
+        yield chunk
+
+
+def read_arrow_chunks(
+    csv_file,
+    chunksize: int,
+    checkpoint: Checkpoint | None,
+    columns: set[str] | None = None,
+    categorical: bool = False,
+):
+    """
+    Yield the chunks of `csv_file` as DataFrames, read with the
+    multithreaded CSV reader of pyarrow the same way `read_chunks` reads
+    them with pandas.
+    """
+    with stage("import"):
+        try:
+            import pyarrow as pa
+            from pyarrow import csv as arrow_csv
+        except ImportError:
+            raise ImportError("--reader pyarrow needs the pyarrow package") from None
 
-        for idx, row in enumerate(pd.read_csv(csv_file, chunksize=chunksize, iterator=True, dialect='excel', delimiter=",", keep_default_na=False, dtype=str)):
-            # Process each chunk sequentially
-            create_graph_from_chunk(row, graph, idx, args.destination, args.format)
+    names = next(csv.reader(csv_file, dialect="excel", delimiter=","))
+    csv_file.seek(0 if checkpoint is None or checkpoint.offset is None else checkpoint.offset)
+    first = 0 if checkpoint is None else checkpoint.rows
+    include = [name for name in names if columns is None or name in columns]
+
+    batches = arrow_csv.open_csv(
+        csv_file.buffer,
+        read_options=arrow_csv.ReadOptions(
+            column_names=names, skip_rows=1 if checkpoint is None or checkpoint.offset is None else 0
+        ),
+        parse_options=arrow_csv.ParseOptions(newlines_in_values=True),
+        convert_options=arrow_csv.ConvertOptions(
+            include_columns=include,
+            column_types=dict.fromkeys(include, pa.string()),
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+
+    def to_pandas(table):
+        nonlocal first
+        df = table.to_pandas()
+        df.index = range(first, first + len(df))
+        first += len(df)
+        if categorical:
+            for name in CATEGORICAL:
+                if name in df:
+                    df[name] = df[name].astype("category")
+        return df
+
+    pending, rows = [], 0
+    for batch in batches:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = pa.Table.from_batches(pending)
+            yield to_pandas(table.slice(0, chunksize))
+            rest = table.slice(chunksize)
+            pending, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield to_pandas(pa.Table.from_batches(pending))
+
+
+def save_checkpoint(checkpoint: Checkpoint, offsets: RecordOffsets, writer, idx: int, rows: int) -> None:
+    """Save that the chunk `idx`, with `rows` rows, was written."""
+    writer.flush()
+    checkpoint.save(
+        idx, checkpoint.rows + rows, offsets.skip(rows), writer.state(), Incremental.state()
+    )
+
+
+def print_summary(stats: Counter) -> None:
+    """Print a summary of the run to stderr."""
+    print(
+        f"Converted {stats['rows']} rows into {stats['triples']} triples in {stats['chunks']} chunks",
+        file=sys.stderr,
+    )
+    if stats["delta_unchanged"] or stats["delta_new"] or stats["delta_changed"]:
+        print(
+            f"Skipped {stats['delta_unchanged']} unchanged listings, converted "
+            f"{stats['delta_new']} new and {stats['delta_changed']} changed ones",
+            file=sys.stderr,
+        )
+    for cache in ["date", "term", "literal"]:
+        hits, misses = stats[f"{cache}_cache_hits"], stats[f"{cache}_cache_misses"]
+        print(
+            f"{cache.capitalize()} cache: {hits} hits, {misses} misses"
+            f" ({hits / ((hits + misses) or 1):.1%} hit rate)",
+            file=sys.stderr,
+        )
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description=__doc__)
@@ -41,7 +329,211 @@ def parse_args() -> argparse.Namespace:
         "-f", "--format", help="RDF format of the output", required=True, type=str
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--stream",
+        help="Append only the new triples of each chunk to the destination "
+        f"instead of re-serializing the whole graph ({', '.join(sorted(STREAM_FORMATS))})",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--native",
+        help="Write N-Triples as the rows are converted, formatting them without rdflib "
+        "and without building a graph per chunk (nt only, implies --stream)",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--compression",
+        help="Compress the output of --native",
+        choices=COMPRESSIONS,
+    )
+
+    parser.add_argument(
+        "--shard-rows",
+        help="Split the output of --native into shards of about SHARD_ROWS rows, "
+        "listed in DESTINATION.manifest.json",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--shard-bytes",
+        help="Split the output of --native into shards of about SHARD_BYTES bytes, "
+        "listed in DESTINATION.manifest.json",
+        type=int,
+    )
+
+    parser.add_argument(
+        "--store",
+        help="Where to accumulate the converted triples: in memory, in a BerkeleyDB "
+        "store, or in sorted runs on disk merged at the end (nt and nquads only)",
+        choices=STORES,
+        default="memory",
+    )
+
+    parser.add_argument(
+        "--store-dir",
+        help="Directory for the temporary files of the disk-backed stores",
+        type=str,
+    )
+
+    parser.add_argument(
+        "-j", "--jobs",
+        help="Number of worker processes converting chunks (-1 uses every core)",
+        default=1,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--pipeline",
+        help="Read, convert and write the chunks at the same time, converting them "
+        "in JOBS worker processes",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--queue-size",
+        help="Number of chunks waiting to be converted, and to be written, "
+        "in the --pipeline (default 4)",
+        default=4,
+        type=int,
+    )
+
+    parser.add_argument(
+        "--engine",
+        help="Convert each chunk with column operations (batch) or row by row (row)",
+        choices=["batch", "row"],
+        default="batch",
+    )
+
+    parser.add_argument(
+        "--reader",
+        help="Read the CSV with pandas, with the multithreaded reader of pyarrow, or with "
+        "the csv module, which starts faster but only works with --engine row (auto picks "
+        "csv for the row engine). Only the columns the converter uses are read, unless "
+        "--delta or --fallback-ids hash need every column",
+        choices=["auto", "pandas", "pyarrow", "csv"],
+        default="auto",
+    )
+
+    parser.add_argument(
+        "--categorical",
+        help="Read low-cardinality columns (site, province, property_type, currency...) "
+        "as categories, to make the chunks smaller (pandas and pyarrow readers)",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--chunksize", help="Number of rows converted at a time", default=3000, type=int
+    )
+
+    parser.add_argument(
+        "--checkpoint",
+        help="Save the progress after every chunk to DESTINATION.checkpoint.json",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--resume",
+        help="Resume the conversion from DESTINATION.checkpoint.json, appending to the "
+        "destination (implies --checkpoint)",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--delta",
+        help="Only convert the listings that are new or changed since the runs that "
+        "used the same INDEX, a SQLite file of the listings converted so far",
+        metavar="INDEX",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--spatial-index",
+        help="Index the coordinates of the real estates in INDEX, a SQLite file that "
+        "can be queried by bounding box or radius",
+        metavar="INDEX",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--fallback-ids",
+        help="How the URIs of listings without an id are made unique: with the time of "
+        "the run (timestamp), with the run id, chunk and a counter (counter), or with "
+        "a hash of the row (hash)",
+        choices=FALLBACK_IDS,
+        default="timestamp",
+    )
+
+    parser.add_argument(
+        "--run-id",
+        help="Run id of the counter fallback ids, made of letters, digits, _ and - "
+        "(default a hash of the source file name)",
+        type=str,
+    )
+
+    parser.add_argument(
+        "--no-ontology-output",
+        help="Don't write the triples of the ontology to the destination",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--no-ontology-cache",
+        help=f"Always parse the ontology instead of using the cache in {CACHE_DIR}",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--profile",
+        help="Time every stage of the conversion, printing a summary and writing it "
+        "to DESTINATION.profile.json",
+        action="store_true",
+    )
+
+    parser.add_argument(
+        "--no-iso-fast-path",
+        help="Always parse dates with dateutil instead of trying datetime.fromisoformat first",
+        action="store_true",
+    )
+
+    args = parser.parse_args()
+
+    if args.reader == "auto":
+        args.reader = "csv" if args.engine == "row" else "pandas"
+    if args.reader == "csv" and args.engine != "row":
+        parser.error("--reader csv reads lists of rows, it can only be used with --engine row")
+    if args.categorical and args.reader == "csv":
+        parser.error("--categorical needs --reader pandas or pyarrow")
+    if args.queue_size < 1:
+        parser.error("--queue-size must be at least 1")
+    if args.run_id is not None and not RUN_ID.fullmatch(args.run_id):
+        parser.error("--run-id may only have letters, digits, _ and -")
+    if args.native and LINE_FORMATS.get(args.format) != "nt":
+        parser.error(f"--native doesn't support the {args.format} format")
+    if args.native and args.store != "memory":
+        parser.error("--native writes the triples as they are converted, it can't use --store")
+    if args.compression and not args.native:
+        parser.error("--compression needs --native")
+    if args.compression and (args.checkpoint or args.resume):
+        parser.error("--compression can't be used with --checkpoint or --resume")
+    if (args.shard_rows or args.shard_bytes) and not args.native:
+        parser.error("--shard-rows and --shard-bytes need --native")
+    if (args.shard_rows or args.shard_bytes) and (args.checkpoint or args.resume):
+        parser.error("sharded outputs can't be used with --checkpoint or --resume")
+    args.stream = args.stream or args.native
+    if args.stream and args.format not in STREAM_FORMATS:
+        parser.error(f"--stream doesn't support the {args.format} format")
+    if args.store == "sorted" and args.format not in LINE_FORMATS:
+        parser.error(f"--store sorted doesn't support the {args.format} format")
+    if args.store == "berkeleydb" and args.stream:
+        parser.error("--store berkeleydb re-serializes the whole graph, it can't be used with --stream")
+    if args.store == "sorted" and (args.checkpoint or args.resume):
+        parser.error("--store sorted keeps its runs in temporary files, it can't be resumed")
+    if args.store == "berkeleydb" and (args.checkpoint or args.resume):
+        parser.error("--store berkeleydb keeps the graph in temporary files, it can't be resumed")
+
+    return args
 
 
 if __name__ == "__main__":
@@ -0,0 +1,424 @@
+"""Module to convert whole DataFrame chunks to RDF graphs."""
+
+from urllib.parse import quote
+
+import pandas as pd
+from rdflib import BNode, Graph, URIRef
+from rdflib.namespace import DC, FOAF, GEO, RDF, RDFS
+
+from .converter import (
+    BRICK,
+    GR,
+    IO,
+    PR,
+    REC,
+    SCHEMA_AXIOMS,
+    SHARED_TRIPLES,
+    SIOC,
+    TIME,
+    feature_literal,
+    location,
+)
+from .dates.dates import parse_date
+from .faker.faker import ML_PREFIX, Faker
+from .incrementals import incrementals
+from .incrementals.incrementals import Incremental, row_hash, row_number
+from .null_objects.factory import DateTime, Float, Integer, String, WKT
+from .mapping.mapping import MAPPING
+from .profiling.profiling import profiled_iter, stage
+from .spatial.spatial import wkt
+
+
+def create_batch_graph(df: pd.DataFrame) -> Graph:
+    """
+    Return a graph `g` with the info of a chunk of rows.
+
+    Builds the same graph as merging `create_graph` of every row, but
+    the anonymized ids, URIs and literals are computed column by column
+    and the triples are added to `g` in bulk.
+
+    Args:
+        df (pd.DataFrame): a Pandas Dataframe with the info to add to `g`.
+    """
+    g: Graph = Graph()
+    g.addN((s, p, o, g) for s, p, o in iter_batch_triples(df) if s and o)
+    return g
+
+
+def iter_batch_triples(df: pd.DataFrame):
+    """
+    Yield the triples of a chunk of rows, including the ones with a
+    missing subject or object, which are left for the caller to drop.
+
+    The triples are yielded in sections, profiled as the stage of the
+    builder of `create_graph` that emits them.
+    """
+    with stage("prepare"):
+        n = len(df)
+        col = lambda name: _column(df, name, n)
+
+        sites = [Faker.site(s) for s in df["site"]]
+        listing_id = _series(df, "listing_id", n).str.removeprefix(ML_PREFIX)
+        key = (pd.Series(sites, index=df.index) + "_" + listing_id).map(
+            quote, na_action="ignore"
+        ).astype(object)
+        listing_ids = listing_id.where(listing_id.notna(), None).tolist()
+
+        row_ids = _row_ids(df, key)
+        [(listings, listing_frags)] = _entities(key, ["listing_"], Incremental.LISTING, row_ids)
+        [(real_estates, real_estate_frags)] = _entities(
+            key, ["real_estate_"], Incremental.REAL_ESTATE, row_ids
+        )
+        # the two spaces of each row, in the order `create_graph` makes them
+        (lands, land_frags), (buildings, building_frags) = _entities(
+            key, ["space_land_", "space_building_"], Incremental.SPACE, row_ids
+        )
+
+        date_extracted = _dates(col("date_extracted"))
+        date_ave = _dates(col("date_ave"))
+
+        locations = [
+            location(p, d, b or c)
+            for p, d, b, c in zip(col("province"), col("district"), col("neighborhood"), col("barrio"))
+        ]
+        provinces = [province for province, _, _, _ in locations]
+        districts = [district for _, district, _, _ in locations]
+        neighborhoods = [neighborhood for _, _, neighborhood, _ in locations]
+
+    def listing_triples():
+        transactions = _cached(
+            lambda t: GR.Sell if t.lower() == "venta" else GR.LeaseOut, col("transaction")
+        )
+        site_nodes = _uris(PR, sites)
+        rows = zip(
+            listings, site_nodes, listing_ids, col("title"), transactions,
+            date_extracted, _dates(col("date_published")),
+        )
+        for listing, site, lid, title, transaction, extracted, published in rows:
+            yield (listing, RDF.type, PR.RealEstateListing)
+            yield (listing, RDFS.label, String(title))
+            yield (listing, GR.hasBusinessFunction, transaction)
+
+            yield from _shared((site, RDF.type, SIOC.Site))
+            yield (listing, SIOC.has_space, site)
+            yield (site, SIOC.space_of, listing)
+
+            yield (listing, SIOC.id, String(lid))
+            yield (listing, SIOC.read_at, extracted)
+            yield (listing, DC.date, published)
+
+    yield from profiled_iter("add_listing", listing_triples())
+
+    def price_triples():
+        price_features = _features("price", listing_frags)
+        for value_col, currency_col, p_type in (
+            ("price", "currency", "BASE"),
+            ("maintenance_fee", "maintenance_fee_currency", "MAINTENANCE FEE"),
+        ):
+            p_type = String(p_type)
+            rows = zip(listings, price_features, col(value_col), col(currency_col), date_extracted)
+            for listing, feature, value, currency, date in rows:
+                if value and currency:
+                    yield from _price(feature, value, currency, p_type, date)
+                    yield (listing, IO.hasFeature, feature)
+
+    yield from profiled_iter("add_price", price_triples())
+
+    def agent_triples():
+        advertiser_name, advertiser_id = col("advertiser_name"), col("advertiser_id")
+        agents = _uris(IO, [a and f"agent_{a}" for a in advertiser_name])
+        accounts = _uris(
+            IO, [a and f"account_{s}_{a}" for s, a in zip(sites, advertiser_id)]
+        )
+        rows = zip(listings, agents, accounts, advertiser_name, advertiser_id)
+        for listing, agent, account, name, adv_id in rows:
+            yield from _shared((agent, RDF.type, FOAF.Agent))
+            yield from _shared((account, RDF.type, SIOC.UserAccount))
+            yield from _shared((account, SIOC.id, String(adv_id)))
+            yield from _shared((account, SIOC.name, String(name)))
+            yield from _shared((agent, FOAF.account, account))
+            yield from _shared((account, SIOC.account_of, agent))
+
+            yield (listing, SIOC.has_creator, account)
+            yield (account, SIOC.creator_of, listing)
+            yield (listing, FOAF.maker, agent)
+            yield (agent, FOAF.made, listing)
+
+    yield from profiled_iter("add_agent", agent_triples())
+
+    def real_estate_triples():
+        property_types = _uris(IO, [str(pt).capitalize() for pt in col("property_type")])
+        for property_type in set(property_types):
+            yield from _axiom((property_type, RDFS.subClassOf, REC.RealEstate))
+
+        latitudes, longitudes = col("latitude"), col("longitude")
+        coordinates = [String(f"[{lat},{lon}]") for lat, lon in zip(latitudes, longitudes)]
+        points = [WKT(wkt(lat, lon)) for lat, lon in zip(latitudes, longitudes)]
+        rows = zip(
+            listings, real_estates, lands, buildings, property_types, coordinates, points,
+            col("room_amnt"),
+        )
+        for listing, real_estate, land, building, property_type, coordinate, wkt_point, room_amnt in rows:
+            yield (listing, SIOC.about, real_estate)
+            yield (real_estate, RDF.type, property_type)
+            yield (land, RDF.type, REC.Site)
+            yield (building, RDF.type, REC.Building)
+
+            point = BNode()
+            yield (point, RDF.type, REC.Point)
+            yield (land, REC.geometry, point)
+            yield (point, REC.coordinates, coordinate)
+            yield (point, GEO.asWKT, wkt_point)
+
+            yield (real_estate, REC.includes, land)
+            yield (real_estate, REC.includes, building)
+            yield (land, BRICK.hasPart, building)
+
+            yield (building, PR.has_number_of_rooms, Integer(room_amnt))
+
+    yield from profiled_iter("add_real_estate", real_estate_triples())
+
+    def location_triples():
+        for *_, triples in locations:
+            yield from triples
+
+    yield from profiled_iter("add_real_estate", location_triples())
+
+    def address_triples():
+        address_features = _features("address", real_estate_frags)
+        for address_col, has_value, has_time, dates in (
+            ("address", IO.hasScraperValue, IO.hasScraperTime, date_extracted),
+            ("direccion", IO.hasAVEValue, IO.hasAVETime, date_ave),
+        ):
+            rows = zip(
+                real_estates, address_features, col(address_col), neighborhoods,
+                districts, provinces, dates,
+            )
+            for real_estate, feature, address, neighborhood, district_node, province_node, date in rows:
+                if address:
+                    yield from _address(
+                        real_estate, feature, has_value, has_time, address,
+                        neighborhood, district_node, province_node, date,
+                    )
+
+    yield from profiled_iter("add_address", address_triples())
+
+    def feature_triples():
+        # the spaces and fragments of each target of the mapping
+        targets = ((lands, land_frags), (buildings, building_frags), (real_estates, real_estate_frags))
+        for plan in MAPPING.features:
+            values = _cached(lambda v: feature_literal(plan.convert(v)), col(plan.column))
+            if all(value is None for value in values):
+                continue
+            yield from _axiom((plan.feature_class, RDFS.subClassOf, IO.Feature))
+            spaces, frags = targets[plan.target]
+            rows = zip(spaces, _features(plan.column, frags), values, date_ave)
+            for space, feature, value, date in rows:
+                if value is not None:
+                    yield from _feature(space, feature, plan.feature_class, value, date)
+
+    yield from profiled_iter("add_feature", feature_triples())
+
+    def surface_triples():
+        for plan in MAPPING.surfaces:
+            size_type = String(plan.size_type)
+            rows = zip(
+                lands, _features(plan.size_type, land_frags),
+                col(plan.column), col(plan.unit_column),
+            )
+            for land, feature, value, unit in rows:
+                if value and unit:
+                    yield from _surface(land, feature, value, unit, size_type)
+
+    yield from profiled_iter("add_surface", surface_triples())
+
+    def room_triples():
+        for plan in MAPPING.rooms:
+            for building, frag, amnt in zip(buildings, building_frags, col(plan.column)):
+                if not amnt or not amnt.isdigit():
+                    continue
+                for i in range(int(amnt)):
+                    r = IO[f"{frag}_{plan.room}_{i}"]
+                    yield (r, RDF.type, plan.room_class)
+                    yield (building, BRICK.hasPart, r)
+
+    yield from profiled_iter("add_room", room_triples())
+
+
+def _axiom(axiom: tuple):
+    """Yield the schema `axiom` unless it was already added during this run."""
+    if axiom not in SCHEMA_AXIOMS:
+        SCHEMA_AXIOMS.add(axiom)
+        yield axiom
+
+
+def _values(df: pd.DataFrame, name: str) -> pd.Series:
+    """Return the column `name` of `df`, with its categories (if read as categorical) as strings."""
+    values = df[name]
+    return values.astype(object) if isinstance(values.dtype, pd.CategoricalDtype) else values
+
+
+def _shared(triple: tuple):
+    """Yield `triple`, shared by many rows, unless it was already added during this run."""
+    if triple[0] and triple[2] and triple not in SHARED_TRIPLES:
+        SHARED_TRIPLES.add(triple)
+        yield triple
+
+
+def _series(df: pd.DataFrame, name: str, n: int) -> pd.Series:
+    """Return the column `name` of `df`, with NaN for the empty values."""
+    if name not in df:
+        return pd.Series([None] * n, index=df.index, dtype=object)
+    values = _values(df, name)
+    return values.where(values != "")
+
+
+def _column(df: pd.DataFrame, name: str, n: int) -> list:
+    """Return the values of the column `name`, with None for the empty ones."""
+    if name not in df:
+        return [None] * n
+    values = _values(df, name)
+    return values.where(values != "", None).tolist()
+
+
+def _cached(func, values: list) -> list:
+    """Apply `func` once to every distinct value that is not None."""
+    cache = {v: func(v) for v in set(values) if v is not None}
+    return [cache.get(v) for v in values]
+
+
+def _dates(values: list) -> list:
+    """Return the `DateTime` literals of `values`, parsing each date once."""
+    return _cached(lambda v: DateTime(parse_date(v)), values)
+
+
+def _uris(ns, names: list) -> list:
+    """Return the URIs of `names` in `ns`, with None for the missing ones."""
+    return _cached(lambda name: ns[name], names)
+
+
+def _row_ids(df: pd.DataFrame, key: pd.Series) -> list | None:
+    """
+    Return the ids of the rows without a key, as `set_row` makes them,
+    or None if the fallback fragments use timestamps.
+    """
+    ids = incrementals.settings()["ids"]
+    if ids == "timestamp":
+        return None
+    return [
+        None if not missing
+        else row_hash(df.iloc[i].to_dict()) if ids == "hash"
+        else row_number(i)
+        for i, missing in enumerate(key.isna().tolist())
+    ]
+
+
+def _entities(
+    key: pd.Series, prefixes: list[str], inc: Incremental, row_ids: list | None = None
+) -> list[tuple[list, list]]:
+    """
+    Return the URIs and fragments of the entities named `prefix` + `key`
+    for each of `prefixes`, where `key` is already quoted. Rows without a
+    key fall back to a URI with an incremental value, or with their id
+    in `row_ids`, the entity of the n-th prefix being the n-th entity of
+    `inc` of the row. The incremental values are taken row by row, as
+    `create_graph` does.
+    """
+    entities = [([], []) for _ in prefixes]
+    for i, (k, missing) in enumerate(zip(key.tolist(), key.isna().tolist())):
+        for occurrence, (prefix, (uris, frags)) in enumerate(zip(prefixes, entities)):
+            if missing:
+                frag = inc.fragment(row_ids[i], occurrence) if row_ids else inc.fragment()
+                uris.append(PR[frag])
+            else:
+                frag = prefix + k
+                uris.append(URIRef(f"{IO}{frag}"))
+            frags.append(frag)
+    return entities
+
+
+def _features(name: str, frags: list) -> list:
+    """Return the URIs of the feature `name` of the given fragments."""
+    prefix = f"{IO}feature_{quote(name)}_"
+    return [URIRef(prefix + quote(frag)) for frag in frags]
+
+
+def _price(feature, value, currency, p_type, date):
+    """Yield the triples of a price, as `add_price` does."""
+    price_value, temporal, date_node = BNode(), BNode(), BNode()
+
+    yield (price_value, RDF.type, GR.UnitPriceSpecification)
+    yield (price_value, GR.hasCurrency, String(currency))
+    yield (price_value, GR.hasCurrencyValue, Float(value))
+    yield (price_value, GR.priceType, p_type)
+
+    yield (temporal, RDF.type, IO.TemporalFeature)
+    yield (temporal, IO.hasScraperValue, price_value)
+
+    yield (date_node, RDF.type, TIME.Instant)
+    yield (date_node, TIME.inXSDDateTimeStamp, date)
+    yield (temporal, IO.hasScraperTime, date_node)
+
+    yield (feature, RDF.type, IO.Precio)
+    yield (feature, IO.hasDetail, temporal)
+
+
+def _address(real_estate, feature, has_value, has_time, address, neighborhood, district, province, date):
+    """Yield the triples of an address, as `add_address` does."""
+    address_value, temporal, date_node = BNode(), BNode(), BNode()
+
+    yield (address_value, RDF.type, IO.PostalAddress)
+    yield (address_value, IO.address, String(address))
+    yield (address_value, IO.neighborhood, neighborhood)
+    yield (address_value, IO.city, district)
+    yield (address_value, IO.province, province)
+
+    yield (temporal, RDF.type, IO.TemporalFeature)
+    yield (temporal, has_value, address_value)
+
+    yield (date_node, RDF.type, TIME.Instant)
+    yield (date_node, TIME.inXSDDateTimeStamp, date)
+    yield (temporal, has_time, date_node)
+
+    yield (feature, RDF.type, IO.Direccion)
+    yield (feature, IO.hasDetail, temporal)
+
+    yield (real_estate, IO.hasFeature, feature)
+
+
+def _feature(space, feature, feature_class, value, date):
+    """Yield the triples of a feature, as `add_feature` does."""
+    feature_value, temporal, date_node = BNode(), BNode(), BNode()
+
+    yield (feature_value, RDF.type, RDFS.Literal)
+    yield (feature_value, RDFS.label, value)
+
+    yield (temporal, RDF.type, IO.TemporalFeature)
+    yield (temporal, IO.hasAVEValue, feature_value)
+
+    yield (date_node, RDF.type, TIME.Instant)
+    yield (date_node, TIME.inXSDDateTimeStamp, date)
+    yield (temporal, IO.hasAVETime, date_node)
+
+    yield (feature, RDF.type, feature_class)
+    yield (feature, IO.hasDetail, temporal)
+
+    yield (space, IO.hasFeature, feature)
+
+
+def _surface(land, feature, value, unit, size_type):
+    """Yield the triples of a surface, as `add_surface` does."""
+    surface_value, temporal = BNode(), BNode()
+
+    yield (surface_value, RDF.type, PR.SizeSpecification)
+    yield (surface_value, GR.hasValue, Float(value))
+    yield (surface_value, GR.hasUnitOfMeasurement, String(unit))
+    yield (surface_value, PR.size_type, size_type)
+
+    yield (temporal, RDF.type, IO.TemporalFeature)
+    yield (temporal, IO.hasScraperValue, surface_value)
+
+    yield (feature, RDF.type, IO.Superficie)
+    yield (feature, IO.hasDetail, temporal)
+
+    yield (land, IO.hasFeature, feature)
@@ -0,0 +1,88 @@
+"""Save and load the progress of a conversion, so it can be resumed."""
+
+import json
+import os
+from typing import BinaryIO
+
+
+class Checkpoint:
+    """
+    Progress of a conversion: the index of the last completed chunk, the
+    rows converted so far, the byte offset of the next row in the source
+    file, the state of the writer and the state of the incrementals.
+    """
+
+    def __init__(self, path: str, source: str, destination: str) -> None:
+        self.path = path
+        self.source = source
+        self.destination = destination
+        self.chunk: int = -1
+        self.rows: int = 0
+        self.offset: int | None = None
+        self.writer: dict = {}
+        self.incrementals: dict[str, int] = {}
+
+    @classmethod
+    def load(cls, path: str, source: str, destination: str) -> "Checkpoint":
+        """
+        Load the checkpoint at `path`, checking that it belongs to a
+        conversion of `source` to `destination`.
+        """
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        if data["source"] != source or data["destination"] != destination:
+            raise ValueError(
+                f"{path} is the checkpoint of {data['source']} -> {data['destination']}"
+            )
+
+        checkpoint = cls(path, source, destination)
+        checkpoint.__dict__.update(data)
+        return checkpoint
+
+    def save(self, chunk: int, rows: int, offset: int, writer: dict, incrementals: dict) -> None:
+        """Record that `chunk` was written, replacing the file atomically."""
+        self.chunk, self.rows, self.offset = chunk, rows, offset
+        self.writer, self.incrementals = writer, incrementals
+
+        data = {k: v for k, v in self.__dict__.items() if k != "path"}
+        with open(f"{self.path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(f"{self.path}.tmp", self.path)
+
+    def remove(self) -> None:
+        """Remove the checkpoint once the conversion is over."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class RecordOffsets:
+    """
+    Track the byte offsets of the records of a CSV file.
+
+    Records may span several lines when a quoted field has line breaks,
+    so a record ends at the first line break after an even number of
+    quotes. Blank lines between records are skipped, as the readers do.
+    """
+
+    def __init__(self, path: str, offset: int | None = None) -> None:
+        self.file: BinaryIO = open(path, "rb")
+        if offset is None:
+            self.skip(1)  # the header
+        else:
+            self.file.seek(offset)
+
+    def skip(self, records: int) -> int:
+        """Skip `records` records and return the offset of the next one."""
+        for _ in range(records):
+            quotes = 0
+            for line in iter(self.file.readline, b""):
+                if quotes == 0 and not line.strip(b"\r\n"):
+                    continue
+                quotes += line.count(b'"')
+                if quotes % 2 == 0:
+                    break
+        return self.file.tell()
+
+    def close(self) -> None:
+        self.file.close()
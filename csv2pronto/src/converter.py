@@ -1,40 +1,332 @@
 """Module to convert dictionaries to RDF graphs."""
 
+from __future__ import annotations
+
 import ast
-from contextlib import suppress
+from collections import Counter
 from datetime import datetime
-import pandas as pd
-import dateutil.parser as dateparser
-from rdflib import BNode, Graph, URIRef
-from rdflib.namespace import DC, FOAF, RDF, RDFS, SDO
+from typing import TYPE_CHECKING, Iterable, Iterator
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import DC, FOAF, GEO, RDF, RDFS, SDO
+from rdflib.plugins.parsers.ntriples import W3CNTriplesParser
 
 from . import Node
-from .faker.faker import Faker
-from .incrementals.incrementals import Incremental
-from .null_objects.factory import Boolean, DateTime, Double, Float, Integer, String
+from .dates import dates
+from .incrementals import incrementals
+from .incrementals.incrementals import Incremental, set_row, set_shard
+from .null_objects import factory, safe_objects
+from .null_objects.factory import Boolean, DateTime, Double, Float, Integer, String, WKT
 from .null_objects.null_objects import NoneNode
-from .null_objects.safe_objects import SafeGraph, SafeNamespace
+from .null_objects.safe_objects import SafeGraph, SafeTriples
+from .profiling import profiling
+from .mapping.mapping import MAPPING
+from .namespaces.namespaces import BRICK, GR, IO, PR, REC, SIOC, TIME
+from .profiling.profiling import profiled, stage
+from .records.records import Listing
+from .spatial.spatial import wkt
 from .wrappers.wrappers import default_to_incremental, default_to_NoneNode
 
-IO = SafeNamespace("http://www.semanticweb.org/luciana/ontologies/2024/8/inmontology#")
-PR = SafeNamespace("https://raw.githubusercontent.com/fdioguardi/pronto/main/ontology/pronto.owl#")
-SIOC = SafeNamespace("http://rdfs.org/sioc/ns#")
-GR = SafeNamespace("http://purl.org/goodrelations/v1#")
-REC = SafeNamespace("https://w3id.org/rec#")
-TIME = SafeNamespace("http://www.w3.org/2006/time#")
-BRICK = SafeNamespace("https://brickschema.org/schema/Brick#")
+if TYPE_CHECKING:
+    import pandas as pd
+
+SCHEMA_AXIOMS: set[tuple[Node, URIRef, Node]] = set()
+"""The schema axioms (e.g. subclasses) added during this run."""
+
+
+def add_axiom(g: Graph, axiom: tuple[Node, URIRef, Node]) -> None:
+    """
+    Add the schema `axiom` to the graph `g` unless it was already added
+    during this run.
+
+    The worker processes send the axioms of each chunk to the main
+    process, which drops the ones already added (see `convert_chunk`).
+    """
+    if axiom not in SCHEMA_AXIOMS:
+        SCHEMA_AXIOMS.add(axiom)
+        g.add(axiom)
+
+
+LOCATIONS: dict[tuple[str | None, str | None, str | None], tuple[Node, Node, Node]] = {}
+"""The province, district and neighborhood URIs found during this run, by their names."""
 
+LOCATION_TRIPLES: set[tuple[Node, URIRef, Node]] = set()
+"""The triples describing the locations added during this run."""
 
-def create_graph_from_chunk(df: pd.DataFrame, graph, idx, destination, format) -> Graph:
+
+def location(
+    province: str | None, district: str | None, neighborhood: str | None
+) -> tuple[Node, Node, Node, list[tuple[Node, URIRef, Node]]]:
+    """
+    Return the URIs of the province, district and neighborhood with the
+    given names, and the triples describing them that weren't returned
+    before during this run, so each location is described only once.
+
+    Like the axioms, the worker processes leave the repeated triples
+    to the main process.
+    """
+    key = (province, district, neighborhood)
+    if key in LOCATIONS:
+        return *LOCATIONS[key], []
+
+    province_node: Node = _create_province(province) if province else NoneNode()
+    district_node: Node = _create_district(district, province) if province and district else NoneNode()
+    neighborhood_node: Node = (
+        _create_neighborhood(province_node, district_node, neighborhood)
+        if district_node else NoneNode()
+    )
+    LOCATIONS[key] = (province_node, district_node, neighborhood_node)
+
+    triples = []
+    for triple in (
+        (district_node, RDF.type, IO.City),
+        (district_node, RDFS.label, String(district)),
+        (province_node, RDF.type, IO.Province),
+        (province_node, RDFS.label, String(province)),
+        (neighborhood_node, REC.locatedIn, district_node),
+        (district_node, REC.locatedIn, province_node),
+    ):
+        if all(triple) and triple not in LOCATION_TRIPLES:
+            LOCATION_TRIPLES.add(triple)
+            triples.append(triple)
+    return province_node, district_node, neighborhood_node, triples
+
+
+SHARED_TRIPLES: set[tuple[Node, URIRef, Node]] = set()
+"""The triples describing the sites, agents and accounts added during this run."""
+
+
+def add_shared(g: Graph, triple: tuple[Node, URIRef, Node]) -> None:
+    """
+    Add `triple`, which describes a site, agent or account shared by
+    many rows, to the graph `g` unless it was already added during this
+    run, so the writers don't need to remember the triples of every row.
+
+    Like the axioms, the worker processes leave the repeated triples
+    to the main process.
+    """
+    if all(triple) and triple not in SHARED_TRIPLES:
+        SHARED_TRIPLES.add(triple)
+        g.add(triple)
+
+
+def fresh_shared(triples: Iterable[tuple[Node, URIRef, Node]]) -> Iterator[tuple[Node, URIRef, Node]]:
+    """
+    Yield the axioms and the triples of the locations, sites, agents and
+    accounts sent by a worker process (see `convert_chunk`) that weren't
+    added before during this run.
+    """
+    for triple in triples:
+        if triple not in SHARED_TRIPLES and triple not in LOCATION_TRIPLES and triple not in SCHEMA_AXIOMS:
+            SHARED_TRIPLES.add(triple)
+            yield triple
+
+
+def remember_shared(triple: tuple[Node, URIRef, Node]) -> None:
+    """
+    Record `triple` as added during this run if it is an axiom or
+    describes a location, site, agent or account, so that it isn't
+    added again.
+    """
+    s, p, o = triple
+    if p == RDFS.subClassOf:
+        SCHEMA_AXIOMS.add(triple)
+    elif not isinstance(s, URIRef) or p in (FOAF.made, SIOC.creator_of):
+        # the links of the agents and accounts to each listing aren't shared
+        return
+    # rdflib's startswith doesn't take tuples of prefixes
+    elif str(s).startswith(_LOCATION_URIS):
+        LOCATION_TRIPLES.add(triple)
+    elif str(s).startswith(_AGENT_URIS) or (p, o) == (RDF.type, SIOC.Site):
+        SHARED_TRIPLES.add(triple)
+
+
+_LOCATION_URIS = tuple(str(IO[name]) for name in ("province_", "district_", "neiborhood_"))
+_AGENT_URIS = tuple(str(IO[name]) for name in ("agent_", "account_"))
+
+
+def reset_shared() -> None:
+    """
+    Forget the axioms and the locations, sites, agents and accounts added
+    so far, to start a new run in the same process.
+
+    `iter_triples` and `create_graph` call it, so each call returns a
+    complete graph.
+    """
+    SCHEMA_AXIOMS.clear()
+    LOCATIONS.clear()
+    LOCATION_TRIPLES.clear()
+    SHARED_TRIPLES.clear()
+
+
+def restore_shared(destination: str, format: str = "nt") -> None:
+    """
+    Remember the shared triples already written to `destination` by an
+    interrupted run, so the resumed run doesn't write them again.
+
+    N-Triples and N-Quads are read line by line, and Turtle with a graph
+    that only passes its triples to `remember_shared`.
+    """
+    if format == "turtle":
+        _SharedGraph().parse(destination, format="turtle")
+        return
+    with open(destination, "rb") as f:
+        W3CNTriplesParser(_SharedSink()).parse(f)
+
+
+class _SharedSink:
+    """Parser sink that passes every triple to `remember_shared`."""
+
+    def triple(self, s, p, o) -> None:
+        remember_shared((s, p, o))
+
+
+class _SharedGraph(Graph):
+    """Graph that passes every triple to `remember_shared` instead of keeping it."""
+
+    def add(self, triple):
+        remember_shared(triple)
+        return self
+
+
+def create_graph_from_chunk(df: pd.DataFrame | list[dict], writer, engine: str = "batch") -> Graph:
     """
     Writes a partial graph `g` with the info of a chunk of rows.
 
     Args:
-        df (pd.DataFrame): a Pandas Dataframe with the info to add to `g`.
+        df (pd.DataFrame | list[dict]): a Pandas Dataframe, or a list of
+            rows, with the info to add to `g`.
+        writer (Writer): the writer that dumps `g` to the destination.
+        engine (str): the engine used by `create_chunk_graph`.
+    """
+    g: Graph = create_chunk_graph(df, engine)
+    with stage("serialize"):
+        writer.write(g)
+    return g
+
+
+def write_chunk(df: pd.DataFrame | list[dict], writer, engine: str = "batch") -> None:
+    """
+    Writes the triples of a chunk of rows as they are converted, without
+    building a graph.
+
+    Args:
+        df (pd.DataFrame | list[dict]): a Pandas Dataframe, or a list of
+            rows, with the info to write.
+        writer (Writer): a writer that drops the repeated triples.
+        engine (str): the engine used by `iter_chunk_triples`.
     """
-    for i in range(len(df)):
-        graph += create_graph(df.iloc[i].to_dict())
-    graph.serialize(destination, format=format, encoding="utf-8")
+    with stage("serialize"):
+        writer.write(iter_chunk_triples(df, engine))
+
+
+def iter_chunk_triples(df: pd.DataFrame | list[dict], engine: str = "batch") -> Iterator:
+    """
+    Yield the triples of a chunk of rows that `create_chunk_graph` would
+    add to its graph, some of them more than once.
+    """
+    if engine == "batch":
+        if isinstance(df, list):
+            raise ValueError("Lists of rows can only be converted by the row engine")
+        with stage("import"):
+            from .batch import iter_batch_triples
+
+        return (t for t in iter_batch_triples(df) if t[0] and t[2])
+
+    return _iter_rows(df if isinstance(df, list) else df.to_dict("records"))
+
+
+def create_chunk_graph(df: pd.DataFrame | list[dict], engine: str = "batch") -> Graph:
+    """
+    Return a graph `g` with the info of a chunk of rows.
+
+    Args:
+        df (pd.DataFrame | list[dict]): a Pandas Dataframe, or a list of
+            rows, with the info to add to `g`.
+        engine (str): "batch" to convert the whole chunk with column
+            operations, or "row" to merge the graph of every row. Lists
+            of rows can only be converted row by row.
+    """
+    if engine == "batch":
+        if isinstance(df, list):
+            raise ValueError("Lists of rows can only be converted by the row engine")
+        with stage("import"):
+            from .batch import create_batch_graph
+
+        with stage("merge"):
+            return create_batch_graph(df)
+
+    rows = df if isinstance(df, list) else df.to_dict("records")
+    g: Graph = Graph()
+    with stage("merge"):
+        g.addN((s, p, o, g) for s, p, o in _iter_rows(rows))
+    return g
+
+
+def convert_chunk(
+    df: pd.DataFrame | list[dict],
+    idx: int,
+    engine: str = "batch",
+    profile: bool = False,
+    ids: dict | None = None,
+    graph: bool = True,
+) -> tuple[list, list, Counter]:
+    """
+    Return the triples of the chunk number `idx`, its axioms and the
+    triples of its locations, sites, agents and accounts, and the
+    counters of its rows, of the caches used while converting it and,
+    if `profile` is set, of its stages. Unless `graph` is set, the
+    triples are not merged into a graph, so they may be repeated.
+
+    Meant to be run in a worker process: the fallback URIs are prefixed
+    with `idx` to keep them unique among workers, and made as the
+    `incrementals.settings()` of the main process `ids` say. The triples are
+    returned as lists so they can be sent back to the main process,
+    which drops the shared triples other chunks already added with
+    `fresh_shared`. Blank nodes are already unique, as their ids are
+    random UUIDs.
+    """
+    incrementals.configure(**(ids or {}))
+    set_shard(idx)
+    profiling.set_profiling(profile)
+    before = cache_stats() + profiling.stats()
+    # the main process remembers the shared triples of the whole run
+    for added in (SCHEMA_AXIOMS, LOCATION_TRIPLES, SHARED_TRIPLES):
+        added.clear()
+    triples = list(create_chunk_graph(df, engine) if graph else iter_chunk_triples(df, engine))
+    shared = SCHEMA_AXIOMS | LOCATION_TRIPLES | SHARED_TRIPLES
+    triples = [triple for triple in triples if triple not in shared]
+    after = cache_stats() + profiling.stats()
+    return triples, list(shared), after - before + Counter(chunks=1, rows=len(df))
+
+
+def cache_stats() -> Counter:
+    "Return the hits and misses of the date, term and literal caches."
+    return dates.cache_stats() + safe_objects.cache_stats() + factory.cache_stats()
+
+
+def iter_triples(rows: Iterable[dict]) -> Iterator[tuple[Node, URIRef, Node]]:
+    """
+    Yield the triples of every row in `rows`, without the ones with a
+    `NoneNode` or `NoneLiteral`, holding only one row's triples at a time.
+
+    Rows may yield the same triples (e.g. the ones of their site), which
+    a graph keeps only once. The axioms and the triples of the locations,
+    sites, agents and accounts are yielded only once per call (see
+    `reset_shared`).
+
+    Args:
+        rows (Iterable[dict]): Dictionaries with the info to add.
+    """
+    reset_shared()
+    yield from _iter_rows(rows)
+
+
+def _iter_rows(rows: Iterable[dict]) -> Iterator[tuple[Node, URIRef, Node]]:
+    """Yield the triples of `rows` not added before during this run."""
+    for row in rows:
+        triples = SafeTriples()
+        add_row(triples, row)
+        yield from triples
 
 
 def create_graph(row: dict) -> Graph:
@@ -44,11 +336,18 @@ def create_graph(row: dict) -> Graph:
     Args:
         row (dict): Dictionary with the info to add.
     """
+    reset_shared()
+    g: Graph = SafeGraph()
+    add_row(g, row)
+    return g
 
-    row = {k: v for k, v in row.items() if v != ""}
-    row = Faker.anonymize(row)
 
-    g: Graph = SafeGraph()
+def add_row(g: Graph | SafeTriples, row: dict) -> None:
+    """Add the info on `row` to the graph `g`."""
+
+    set_row(row)
+    with stage("parse"):
+        row = Listing(row)
 
     listing = add_listing(g, row)
     agent, account = add_agent(g, row)
@@ -61,10 +360,9 @@ def create_graph(row: dict) -> Graph:
 
     g.add((listing, SIOC.about, real_estate))
 
-    return g
-
 
-def add_listing(g: Graph, row: dict) -> Node:
+@profiled("add_listing")
+def add_listing(g: Graph, row: Listing) -> Node:
     """Add listing to the graph `g` and return the listing's `Node`."""
 
     @default_to_incremental(PR, Incremental.LISTING)
@@ -74,47 +372,45 @@ def add_listing(g: Graph, row: dict) -> Node:
     listing: Node = _create_listing()
     g.add((listing, RDF.type, PR.RealEstateListing))
 
-    if row.get("url"):
-        g.add((listing, SIOC.link, URIRef(row["url"])))
-    g.add((listing, RDFS.label, String(row.get("title"))))
+    if row.url:
+        g.add((listing, SIOC.link, URIRef(row.url)))
+    g.add((listing, RDFS.label, String(row.title)))
     # g.add((listing, IO.descripcion, String(row.get("description")))) #TODO: cambiar comment
 
     ###
 
-    if row.get("transaction"):
+    if row.transaction:
         buisness_func = (
-            GR.Sell if row["transaction"].lower() == "venta" else GR.LeaseOut
+            GR.Sell if row.transaction.lower() == "venta" else GR.LeaseOut
         )
         g.add((listing, GR.hasBusinessFunction, buisness_func))
 
     site: Node = PR[row["site"]]
-    g.add((site, RDF.type, SIOC.Site))
+    add_shared(g, (site, RDF.type, SIOC.Site))
     g.add((listing, SIOC.has_space, site)) #TODO: cambiar has_space
     g.add((site, SIOC.space_of, listing)) #TODO: cambiar space_of
 
-    g.add((listing, SIOC.id, String(row.get("listing_id"))))
+    g.add((listing, SIOC.id, String(row.listing_id)))
 
-    if row.get("date_extracted"):
-        date = dateparser.parse(row["date_extracted"])
-        g.add((listing, SIOC.read_at, DateTime(date)))
+    if row.date_extracted:
+        g.add((listing, SIOC.read_at, DateTime(row.date_extracted)))
 
-    if row.get("date_published"):
-        date = dateparser.parse(row["date_published"])
-        g.add((listing, DC.date, DateTime(date)))
+    if row.date_published:
+        g.add((listing, DC.date, DateTime(row.date_published)))
         
 
-    if row.get("price") and row.get("currency"):
-        price: Node = add_price(g, listing, row["price"], row["currency"], "BASE", dateparser.parse(row["date_extracted"]))
+    if row.price and row.currency:
+        price: Node = add_price(g, listing, row.price, row.currency, "BASE", row.date_extracted)
         g.add((listing, IO.hasFeature, price))
 
-    if row.get("maintenance_fee") and row.get("maintenance_fee_currency"):
+    if row.maintenance_fee and row.maintenance_fee_currency:
         expenses: Node = add_price(
             g,
             listing,
-            row.get("maintenance_fee", ""),
-            row.get("maintenance_fee_currency", ""),
+            row.maintenance_fee,
+            row.maintenance_fee_currency,
             "MAINTENANCE FEE",
-            dateparser.parse(row["date_extracted"])
+            row.date_extracted
         )
 
         g.add((listing, IO.hasFeature, expenses))
@@ -124,6 +420,7 @@ def add_listing(g: Graph, row: dict) -> Node:
     return listing
 
 
+@profiled("add_price")
 def add_price(g: Graph, listing:Node, value: float, currency: str, p_type: str, date: datetime|None) -> Node:
     """Add price to the graph `g` and return the price's `Node`."""
 
@@ -151,7 +448,8 @@ def add_price(g: Graph, listing:Node, value: float, currency: str, p_type: str,
 
 
 
-def add_agent(g: Graph, row: dict) -> tuple[Node, Node]:
+@profiled("add_agent")
+def add_agent(g: Graph, row: Listing) -> tuple[Node, Node]:
     """
     Add real estate agent to the graph `g` and return a tuple with the
     `Node`s of the agent and its user account.
@@ -168,18 +466,19 @@ def add_agent(g: Graph, row: dict) -> tuple[Node, Node]:
     agent: Node = _create_agent()
     account: Node = _create_account()
 
-    g.add((agent, RDF.type, FOAF.Agent))
-    g.add((account, RDF.type, SIOC.UserAccount))
+    add_shared(g, (agent, RDF.type, FOAF.Agent))
+    add_shared(g, (account, RDF.type, SIOC.UserAccount))
 
-    g.add((account, SIOC.id, String(row.get("advertiser_id"))))
-    g.add((account, SIOC.name, String(row.get("advertiser_name"))))
-    g.add((agent, FOAF.account, account))
-    g.add((account, SIOC.account_of, agent))
+    add_shared(g, (account, SIOC.id, String(row.advertiser_id)))
+    add_shared(g, (account, SIOC.name, String(row.advertiser_name)))
+    add_shared(g, (agent, FOAF.account, account))
+    add_shared(g, (account, SIOC.account_of, agent))
 
     return agent, account
 
 
-def add_real_estate(g: Graph, row: dict) -> Node:
+@profiled("add_real_estate")
+def add_real_estate(g: Graph, row: Listing) -> Node:
     """
     Add real estate to the graph `g` and return the real estate's
     `Node`.
@@ -197,9 +496,9 @@ def add_real_estate(g: Graph, row: dict) -> Node:
     land: Node = _create_space("land")  
     building: Node = _create_space("building")  
     
-    g.add((real_estate, RDF.type, IO[str(row.get("property_type")).capitalize()])) #subclase de RealEstate
-    if not (IO[str(row.get("property_type")).capitalize()], RDFS.subClassOf, REC.RealEstate) in g:
-        g.add((IO[str(row.get("property_type")).capitalize()], RDFS.subClassOf, REC.RealEstate))
+    property_type: Node = IO[str(row.property_type).capitalize()]
+    g.add((real_estate, RDF.type, property_type)) #subclase de RealEstate
+    add_axiom(g, (property_type, RDFS.subClassOf, REC.RealEstate))
 
     g.add((land, RDF.type, REC.Site))
     g.add((building, RDF.type, REC.Building))
@@ -208,37 +507,28 @@ def add_real_estate(g: Graph, row: dict) -> Node:
     point: Node = BNode()
     g.add((point, RDF.type, REC.Point))
     g.add((land, REC.geometry, point)) ##tiene uno que se llama point también, no sé
-    g.add((point, REC.coordinates, String(f"[{row.get('latitude')},{row.get('longitude')}]")))
+    g.add((point, REC.coordinates, String(f"[{row.latitude},{row.longitude}]")))
+    g.add((point, GEO.asWKT, WKT(wkt(row.latitude, row.longitude))))
     #-----
 
 
-    district: Node = _create_district(row["district"], row["province"])
-    province: Node = _create_province(row["province"])
-    
-    barrio= None
-    if row.get("neighborhood"):
-        barrio= str(row["neighborhood"])
-    elif row.get("barrio"):
-        barrio= str(row["barrio"])
-    
-    neighborhood : Node = _create_neighborhood(province, district, barrio)
+    barrio= row.neighborhood or row.barrio
 
+    province, district, neighborhood, location_triples = location(
+        row.province, row.district, barrio
+    )
+    for triple in location_triples:
+        g.add(triple)
 
-    g.add((district, RDF.type, IO.City))
-    g.add((district, RDFS.label, String(row.get("district"))))
-    
-    g.add((province, RDF.type, IO.Province))
-    g.add((province, RDFS.label, String(row.get("province"))))
-
-    if row.get("address"):
-        add_address(g, real_estate, IO.hasScraperValue, IO.hasScraperTime, str(row.get("address")), neighborhood, district, province, dateparser.parse(row.get("date_extracted")))
-    if row.get("direccion"):
-        add_address(g, real_estate, IO.hasAVEValue, IO.hasAVETime,  str(row.get("direccion")), neighborhood, district, province, dateparser.parse(row.get("date_ave")))
+    if row.address:
+        add_address(g, real_estate, IO.hasScraperValue, IO.hasScraperTime, row.address, neighborhood, district, province, row.date_extracted)
+    if row.direccion:
+        add_address(g, real_estate, IO.hasAVEValue, IO.hasAVETime, row.direccion, neighborhood, district, province, row.date_ave)
 
     # if row.get("neighborhood"):
-    #     add_neighborhood(g, real_estate, IO.hasScraperValue, IO.hasScraperTime, str(row["neighborhood"]), district, province, dateparser.parse(row.get("date_extracted")))
+    #     add_neighborhood(g, real_estate, IO.hasScraperValue, IO.hasScraperTime, str(row["neighborhood"]), district, province, parse_date(row.get("date_extracted")))
     # if row.get("barrio"):
-    #     add_neighborhood(g, real_estate, IO.hasAVEValue, IO.hasAVETime, str(row["barrio"]), district, province, dateparser.parse(row.get("date_ave")))
+    #     add_neighborhood(g, real_estate, IO.hasAVEValue, IO.hasAVETime, str(row["barrio"]), district, province, parse_date(row.get("date_ave")))
 
     
     g.add((real_estate, REC.includes, land))
@@ -248,9 +538,6 @@ def add_real_estate(g: Graph, row: dict) -> Node:
 
     # g.add((real_estate, REC.locatedIn, district))
     # g.add((real_estate, REC.locatedIn, province))
-    g.add((neighborhood, REC.locatedIn, district))
-
-    g.add((district, REC.locatedIn, province))
     #---
 
     # if row.get("year_built"):
@@ -269,64 +556,28 @@ def add_real_estate(g: Graph, row: dict) -> Node:
     # g.add((space, PR.orientation, String(row.get("orientation"))))
     # g.add((space, PR.disposition, String(row.get("disposition"))))
 
-    # add features to LAND
-    for s in ["esquina", "pileta", "loteo_ph",  "indiviso", "irregular"]:
-        with suppress(KeyError):
-            if row[s] == "True":
-                value = row[s] == "True"
-            else:
-                value = row[s]
-
-            if value:
-                add_feature(g, land, s, value, dateparser.parse(row.get("date_ave")))
-    
-    #add features to BUILDING
-    for s in ["es_monetizable", "a_demoler"]:
-        with suppress(KeyError):
-            if row[s] == "True":
-                value = row[s] == "True"
-            else:
-                value = row[s]
-
-            if value:
-                add_feature(g, building, s, value, dateparser.parse(row.get("date_ave")))
-
-    #add features to REAL ESTATE
-    for s in ["es_multioferta", "preventa", "posesion"]:
-        with suppress(KeyError):
-            if row[s] == "True":
-                value = row[s] == "True"
-            else:
-                value = row[s]
-
-            if value:
-                add_feature(g, real_estate, s, value, dateparser.parse(row.get("date_ave")))
+    # add the features of the mapping to the LAND, BUILDING or REAL ESTATE
+    spaces = (land, building, real_estate)
+    for plan, value in zip(MAPPING.features, row.features):
+        if value is not None:
+            add_feature(g, spaces[plan.target], plan.column, value, row.date_ave, plan.feature_class)
 
         
 
     # features: dict = ast.literal_eval(row.get("features") or "{}")
     # for feature, value in features.items():
-    #     add_feature(g, real_estate, feature, value, dateparser.parse(row.get("date_extracted")))
+    #     add_feature(g, real_estate, feature, value, parse_date(row.get("date_extracted")))
     
     # add surfaces
-    for s in ["total", "covered", "uncovered", "land"]:
-        with suppress(KeyError):
-            value = row[f"{s}_surface"] or row[f"reconstructed_{s}_surface"]
-            unit = row[f"{s}_surface_unit"] or row[f"reconstructed_{s}_surface_unit"]
-
-            if value and unit:
-                add_surface(g, land, value, unit, s)
+    for plan, (value, unit) in zip(MAPPING.surfaces, row.surfaces):
+        if value and unit:
+            add_surface(g, land, value, unit, plan.size_type)
 
     # add amount of rooms
-    g.add((building, PR.has_number_of_rooms, Integer(row.get("room_amnt"))))
-    rooms: dict[str, Node] = {
-        "bath": REC.Bathroom,
-        "garage": REC.Garage,
-        "bed": REC.Bedroom,
-        "toilette": REC.Toilet,
-    }
-    for room, room_class in rooms.items():
-        add_room(g, building, row, room, room_class)
+    g.add((building, PR.has_number_of_rooms, Integer(row.room_amnt)))
+    for plan, amnt in zip(MAPPING.rooms, row.rooms):
+        if amnt:
+            add_room(g, building, amnt, plan.room, plan.room_class)
    
     return real_estate
 
@@ -345,6 +596,7 @@ def _create_neighborhood(province:URIRef, district:URIRef, neighborhood:str):
     ]
 
 
+@profiled("add_address")
 def add_address(g: Graph, real_estate: Node, hasValue: URIRef, hasTime:URIRef,address: str, neighborhood: Node, district: Node, province: Node, date: datetime | None) -> Node:
     """Add address to the graph g and return the address's Node."""
     addressValue: Node = BNode()
@@ -379,21 +631,15 @@ def create_feature(subject: Node, feature: str) -> Node:
     return IO[f"feature_{feature}_{subject.fragment}"]
 
 
-def add_feature(g: Graph, space: Node, featureName :str, value, date: datetime|None) -> Node: 
+@profiled("add_feature")
+def add_feature(g: Graph, space: Node, featureName :str, value, date: datetime|None, featureClass: Node) -> Node: 
     featureValue: Node = BNode()
     feature: Node = create_feature(space, featureName)
     temporalFeature: Node = BNode() # no seria bNode¿?
     dateNode: Node = BNode() 
     
     g.add((featureValue, RDF.type, RDFS.Literal)) # ⸘Literal‽
-    if (type(value)==int):
-        g.add((featureValue, RDFS.label, Integer(value)))
-    if (type(value)==float):
-        g.add((featureValue, RDFS.label, Double(value)))
-    if (type(value)==str):
-        g.add((featureValue, RDFS.label, String(value)))
-    if (type(value)==bool):
-        g.add((featureValue, RDFS.label, Boolean(value)))
+    g.add((featureValue, RDFS.label, feature_literal(value)))
     
     g.add((temporalFeature, RDF.type, IO.TemporalFeature))
     g.add((temporalFeature, IO.hasAVEValue, featureValue))
@@ -402,17 +648,30 @@ def add_feature(g: Graph, space: Node, featureName :str, value, date: datetime|N
     g.add((dateNode, TIME.inXSDDateTimeStamp, DateTime(date)))
     g.add((temporalFeature, IO.hasAVETime, dateNode))
     
-    g.add((feature, RDF.type, IO[featureName.capitalize()]))
+    g.add((feature, RDF.type, featureClass))
     g.add((feature, IO.hasDetail, temporalFeature))
 
-    if not (IO[featureName.capitalize()], RDFS.subClassOf, IO.Feature) in g:
-        g.add((IO[featureName.capitalize()], RDFS.subClassOf, IO.Feature))
+    add_axiom(g, (featureClass, RDFS.subClassOf, IO.Feature))
 
 
     g.add((space, IO.hasFeature, feature))
 
     return featureValue
 
+
+def feature_literal(value) -> Literal | None:
+    """Return the `Literal` of the value of a feature, typed after its Python type."""
+    if (type(value)==int):
+        return Integer(value)
+    if (type(value)==float):
+        return Double(value)
+    if (type(value)==str):
+        return String(value)
+    if (type(value)==bool):
+        return Boolean(value)
+    return None
+
+@profiled("add_surface")
 def add_surface(g: Graph, space: Node, value: float, unit: str, s_type: str) -> Node:
     """Add surface to the graph g and return the surface's Node."""
     surfaceValue: Node = BNode()
@@ -434,16 +693,9 @@ def add_surface(g: Graph, space: Node, value: float, unit: str, s_type: str) ->
 
     return surfaceValue
 
-def add_room(g: Graph, space: Node, row: dict, room: str, room_class: Node) -> None:
-    """Add rooms to the graph `g`."""
-
-    amnt = row.get(f"{room}_amnt")
-    if not amnt:
-        return
-
-    if not amnt.isdigit():
-        return
-    amnt = int(amnt)
+@profiled("add_room")
+def add_room(g: Graph, space: Node, amnt: int, room: str, room_class: Node) -> None:
+    """Add `amnt` rooms to the graph `g`."""
 
     def _create_room() -> Node:
         fragment = getattr(space, "fragment", None)
@@ -0,0 +1,43 @@
+import collections
+import functools
+from datetime import datetime
+
+from ..profiling.profiling import profiled
+
+CACHE_SIZE = 4096
+
+_iso_fast_path: bool = True
+
+
+def set_iso_fast_path(enabled: bool) -> None:
+    """
+    Enable or disable trying `datetime.fromisoformat` before falling
+    back to dateutil.
+    """
+    global _iso_fast_path
+    _iso_fast_path = enabled
+    parse_date.cache_clear()
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+@profiled("parse_date")
+def parse_date(value: str) -> datetime:
+    """
+    Parse a date, remembering the last `CACHE_SIZE` distinct values, as
+    the rows of a file share only a handful of dates.
+    """
+    if _iso_fast_path:
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    # dateutil is only imported if a date is not in ISO format
+    import dateutil.parser
+
+    return dateutil.parser.parse(value)
+
+
+def cache_stats() -> collections.Counter:
+    "Return the hits and misses of the date cache."
+    info = parse_date.cache_info()
+    return collections.Counter(date_cache_hits=info.hits, date_cache_misses=info.misses)
@@ -0,0 +1,121 @@
+"""
+Index of the listings converted by previous runs, so that a run only
+converts the listings that are new or changed.
+"""
+
+import collections
+import hashlib
+import sqlite3
+import threading
+
+from ..namespaces.namespaces import listing_key
+
+IGNORED: set[str] = {"date_extracted", "date_ave", "listing_age"}
+"""Columns that change on every scrape without the listing changing."""
+
+BATCH_SIZE = 500
+"""Maximum number of listings looked up in the index at once."""
+
+
+class DeltaIndex:
+    """
+    Persistent index, kept in a SQLite database at `path`, with the hash
+    of the last converted content of every listing, keyed by its
+    anonymized URI (`listing_{site}_{listing_id}`).
+
+    Chunks are filtered as they are read, and their listings are saved
+    to the index only after they are written, in the same order. Rows
+    without a listing id are always converted.
+    """
+
+    def __init__(self, path: str) -> None:
+        # chunks are read in the worker threads of the parallel modes
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS listings (uri TEXT PRIMARY KEY, hash TEXT NOT NULL)"
+        )
+        self.lock = threading.Lock()
+        # the rows read and the index updates of the chunks not written yet
+        self.read: collections.deque[tuple[int, dict[str, str]]] = collections.deque()
+        self.pending: dict[str, str] = {}
+        self.updates: dict[str, str] = {}
+        self.stats: collections.Counter = collections.Counter()
+
+    def filter(self, chunk):
+        """
+        Return the rows of `chunk` (a DataFrame or a list of rows) whose
+        listing is new or changed since it was last converted.
+        """
+        rows = chunk if isinstance(chunk, list) else chunk.to_dict("records")
+        keys = [listing_key(row) for row in rows]
+        hashes = [_hash(row) for row in rows]
+
+        with self.lock:
+            known = self._lookup({k for k in keys if k is not None})
+            updates: dict[str, str] = {}
+            keep = []
+            for key, digest in zip(keys, hashes):
+                if key is None:
+                    keep.append(True)
+                    continue
+                last = self.pending.get(key) or known.get(key)
+                if last == digest:
+                    self.stats["delta_unchanged"] += 1
+                    keep.append(False)
+                    continue
+                self.stats["delta_changed" if last else "delta_new"] += 1
+                self.pending[key] = updates[key] = digest
+                keep.append(True)
+            self.read.append((len(rows), updates))
+
+        if isinstance(chunk, list):
+            return [row for row, k in zip(chunk, keep) if k]
+        return chunk[keep]
+
+    def written(self) -> int:
+        """
+        Record that the oldest chunk filtered was written, and return
+        the number of rows it had before being filtered.
+        """
+        with self.lock:
+            rows, updates = self.read.popleft()
+            self.updates.update(updates)
+        return rows
+
+    def commit(self) -> None:
+        """Save the listings of the chunks written to the index."""
+        with self.lock:
+            with self.db:
+                self.db.executemany(
+                    "INSERT OR REPLACE INTO listings VALUES (?, ?)", self.updates.items()
+                )
+            for key, digest in self.updates.items():
+                if self.pending.get(key) == digest:
+                    del self.pending[key]
+            self.updates = {}
+
+    def close(self) -> None:
+        self.db.close()
+
+    def _lookup(self, keys: set[str]) -> dict[str, str]:
+        """Return the hashes in the index of `keys`."""
+        keys, found = list(keys), {}
+        for i in range(0, len(keys), BATCH_SIZE):
+            batch = keys[i : i + BATCH_SIZE]
+            found.update(
+                self.db.execute(
+                    f"SELECT uri, hash FROM listings WHERE uri IN ({','.join('?' * len(batch))})",
+                    batch,
+                )
+            )
+        return found
+
+
+def _hash(row: dict) -> str:
+    """Return the hash of the values of `row`, except the ignored columns."""
+    values = (
+        f"{k}={v if isinstance(v, str) else ''}"
+        for k, v in sorted(row.items(), key=lambda item: str(item[0]))
+        if k not in IGNORED
+    )
+    return hashlib.blake2b("\x1f".join(values).encode(), digest_size=16).hexdigest()
@@ -1,6 +1,23 @@
 import datetime
 import enum
-import itertools
+import hashlib
+import re
+
+FALLBACK_IDS: list[str] = ["timestamp", "counter", "hash"]
+
+RUN_ID = re.compile(r"[A-Za-z0-9_-]*")
+"""The run ids, which go as they are into the fragments of the URIs."""
+
+_shard: str = ""
+_next: dict[str, int] = {}
+_ids: str = "timestamp"
+_run_id: str = ""
+_timestamp: str | None = None
+# the id of the row being converted, the rows of the shard so far and
+# the fragments of each class made for the row
+_row: str = ""
+_rows: int = 0
+_occurrences: dict[str, int] = {}
 
 
 def timestamp() -> str:
@@ -8,18 +25,107 @@ def timestamp() -> str:
     return str(datetime.datetime.now().timestamp()).replace(".", "")
 
 
+def configure(ids: str = "timestamp", run_id: str = "") -> None:
+    """
+    Select how the fallback fragments are made unique:
+
+    - "timestamp": the time the process first needed one, and a counter.
+    - "counter": `run_id`, the shard and the number of the row in the
+      shard, so the same run always produces the same fragments.
+    - "hash": the hash of the row, so the same row always produces the
+      same fragments.
+
+    `run_id` may only have letters, digits, "_" and "-", as the engines
+    quote the fragments differently.
+    """
+    global _ids, _run_id
+    if ids not in FALLBACK_IDS:
+        raise ValueError(f"Unknown fallback ids {ids}")
+    if not RUN_ID.fullmatch(run_id):
+        raise ValueError(f"Invalid run id {run_id!r}: only letters, digits, _ and - are allowed")
+    _ids, _run_id = ids, run_id
+
+
+def settings() -> dict[str, str]:
+    "Return the arguments of `configure`, to configure worker processes."
+    return {"ids": _ids, "run_id": _run_id}
+
+
+def set_shard(shard: int | None) -> None:
+    """
+    Set the shard (e.g. the index of the chunk being converted) that
+    prefixes the fragments, so that fragments created by different
+    processes never collide.
+    """
+    global _shard, _rows
+    _shard = "" if shard is None else f"{shard}_"
+    _rows = 0
+
+
+def set_row(row: dict) -> None:
+    "Set the row being converted, which identifies the fragments unless they use timestamps."
+    global _row, _rows
+    if _ids == "hash":
+        _row = row_hash(row)
+    elif _ids == "counter":
+        _row = row_number(_rows)
+        _rows += 1
+    _occurrences.clear()
+
+
+def row_hash(row: dict) -> str:
+    "Return the hash of the non-empty values of `row`."
+    values = "\x1f".join(
+        f"{k}={v}" for k, v in sorted(row.items(), key=lambda item: str(item[0]))
+        if isinstance(v, str) and v != ""
+    )
+    return hashlib.blake2b(values.encode(), digest_size=8).hexdigest()
+
+
+def row_number(position: int) -> str:
+    "Return the id of the row at `position` in the shard."
+    return f"{_run_id}_{_shard}{position}"
+
+
 class Incremental(enum.Enum):
     """
     Enumeration of an `itertools.count`-like incremental for each class.
     """
 
-    REAL_ESTATE = itertools.count()
-    SPACE = itertools.count()
-    LISTING = itertools.count()
+    REAL_ESTATE = enum.auto()
+    SPACE = enum.auto()
+    LISTING = enum.auto()
 
-    def fragment(self) -> str:
+    def fragment(self, row: str | None = None, occurrence: int | None = None) -> str:
         """
         Return the fragment part of a URI, consisting of the class name
         in lowercase and the next value of the incremental.
+
+        Unless the fragments use timestamps, the value is the id of the
+        row set with `set_row`, or `row`, and the number of fragments of
+        this class made for it before, or `occurrence`.
         """
-        return self.name.lower() + "_" + timestamp() + "_" + str(next(self.value))
+        name = self.name.lower() + "_"
+        if _ids != "timestamp":
+            if occurrence is None:
+                occurrence = _occurrences.get(self.name, 0)
+                _occurrences[self.name] = occurrence + 1
+            return name + (row or _row) + "_" + str(occurrence)
+
+        global _timestamp
+        if _timestamp is None:
+            _timestamp = timestamp()
+        value = _next.get(self.name, 0)
+        _next[self.name] = value + 1
+        return name + _shard + _timestamp + "_" + str(value)
+
+    @classmethod
+    def state(cls) -> dict[str, int]:
+        "Return the next value of each incremental."
+        return {inc.name: _next.get(inc.name, 0) for inc in cls}
+
+    @classmethod
+    def restore(cls, state: dict[str, int]) -> None:
+        "Advance each incremental to the next value saved in `state`."
+        for inc in cls:
+            _next[inc.name] = max(_next.get(inc.name, 0), state.get(inc.name, 0))
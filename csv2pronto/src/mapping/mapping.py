@@ -0,0 +1,127 @@
+"""
+Mapping of the feature, surface and room columns to the nodes they
+describe, read from `mapping.json` and compiled once into the plans the
+engines follow for every row.
+
+To convert a new feature column, add it to the `features` of the file
+with the `target` it describes (`land`, `building` or `real_estate`),
+the `datatype` of its values and the `class` of the feature.
+"""
+
+import json
+import os
+from typing import Callable, NamedTuple
+from urllib.parse import quote
+
+from rdflib import URIRef
+
+MAPPING_FILE: str = os.path.join(os.path.dirname(__file__), "mapping.json")
+
+TARGETS: list[str] = ["land", "building", "real_estate"]
+"""The nodes a feature can describe, in the order the engines pass them."""
+
+
+def _flag(value: str) -> bool | str:
+    """Return True for "True", or the string itself."""
+    return True if value == "True" else value
+
+
+def _integer(value: str) -> int | None:
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+def _double(value: str) -> float | None:
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+CONVERTERS: dict[str, Callable[[str], object]] = {
+    "flag": _flag,
+    "boolean": lambda value: value.lower() == "true",
+    "integer": _integer,
+    "double": _double,
+    "string": str,
+}
+"""How the values of each datatype are parsed, before being typed as literals."""
+
+
+class FeaturePlan(NamedTuple):
+    column: str
+    target: int
+    convert: Callable[[str], object]
+    feature_class: URIRef
+
+
+class SurfacePlan(NamedTuple):
+    column: str
+    unit_column: str
+    size_type: str
+
+
+class RoomPlan(NamedTuple):
+    column: str
+    room: str
+    room_class: URIRef
+
+
+class Mapping(NamedTuple):
+    features: list[FeaturePlan]
+    surfaces: list[SurfacePlan]
+    rooms: list[RoomPlan]
+
+    def columns(self) -> list[str]:
+        """Return the columns the mapping reads."""
+        return [
+            *(plan.column for plan in self.features),
+            *(c for plan in self.surfaces for c in (plan.column, plan.unit_column)),
+            *(plan.column for plan in self.rooms),
+        ]
+
+
+def compile_mapping(path: str = MAPPING_FILE) -> Mapping:
+    """
+    Read the mapping at `path` and return its plans, raising a
+    `ValueError` if a target, datatype or prefix is unknown.
+    """
+    with open(path, encoding="utf-8") as f:
+        spec = json.load(f)
+    prefixes: dict[str, str] = spec.get("prefixes", {})
+
+    def uri(curie: str) -> URIRef:
+        prefix, _, name = curie.partition(":")
+        if prefix not in prefixes:
+            raise ValueError(f"Unknown prefix in {curie} of {path}")
+        return URIRef(prefixes[prefix] + quote(name))
+
+    features = []
+    for feature in spec.get("features", []):
+        if feature["target"] not in TARGETS:
+            raise ValueError(f"Unknown target {feature['target']} of {feature['column']} in {path}")
+        datatype = feature.get("datatype", "flag")
+        if datatype not in CONVERTERS:
+            raise ValueError(f"Unknown datatype {datatype} of {feature['column']} in {path}")
+        features.append(
+            FeaturePlan(
+                feature["column"], TARGETS.index(feature["target"]), CONVERTERS[datatype],
+                uri(feature["class"]),
+            )
+        )
+
+    surfaces = [
+        SurfacePlan(surface["column"], surface["unit"], surface["type"])
+        for surface in spec.get("surfaces", [])
+    ]
+    rooms = [
+        RoomPlan(room["column"], room["room"], uri(room["class"]))
+        for room in spec.get("rooms", [])
+    ]
+    return Mapping(features, surfaces, rooms)
+
+
+MAPPING: Mapping = compile_mapping()
+"""The plans of `MAPPING_FILE`."""
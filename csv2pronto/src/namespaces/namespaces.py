@@ -0,0 +1,24 @@
+"""Namespaces of the converted graph, and the URIs shared by several modules."""
+
+from ..faker.faker import Faker
+from ..null_objects.safe_objects import SafeNamespace
+
+IO = SafeNamespace("http://www.semanticweb.org/luciana/ontologies/2024/8/inmontology#")
+PR = SafeNamespace("https://raw.githubusercontent.com/fdioguardi/pronto/main/ontology/pronto.owl#")
+SIOC = SafeNamespace("http://rdfs.org/sioc/ns#")
+GR = SafeNamespace("http://purl.org/goodrelations/v1#")
+REC = SafeNamespace("https://w3id.org/rec#")
+TIME = SafeNamespace("http://www.w3.org/2006/time#")
+BRICK = SafeNamespace("https://brickschema.org/schema/Brick#")
+
+
+def listing_key(row: dict, kind: str = "listing") -> str | None:
+    """
+    Return the anonymized URI of the `kind` ("listing" or "real_estate")
+    of `row`, a row of the source, as the converter builds it
+    (`{kind}_{site}_{listing_id}`), or None if it has no site or id.
+    """
+    site, listing_id = row.get("site"), row.get("listing_id")
+    if not site or not listing_id or not isinstance(listing_id, str):
+        return None
+    return str(IO[f"{kind}_{Faker.site(site)}_{Faker.id(listing_id)}"])
@@ -1,14 +1,43 @@
+import collections
+import functools
+
 from rdflib import XSD, Literal
+from rdflib.namespace import GEO
 
 from .null_objects import NoneLiteral
 
+CACHE_SIZE = 65536
+
 
 def literal_factory(value, *a, **kwa):
     """
     Create a `Literal` unless the value is None, in which case return a
     `NoneLiteral`.
+
+    Typed literals are interned, so that repeated values share a single
+    `Literal`.
     """
-    return NoneLiteral(value, *a) if value is None else Literal(value, *a, **kwa)
+    if value is None:
+        return NoneLiteral(value, *a)
+    if a or kwa.keys() - {"datatype"}:
+        return Literal(value, *a, **kwa)
+    return _typed_literal(value, kwa.get("datatype"), getattr(value, "tzinfo", None))
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE, typed=True)
+def _typed_literal(value, datatype, tzinfo) -> Literal:
+    """
+    Return the `Literal` of `value`, remembering the last `CACHE_SIZE`
+    ones. `tzinfo` is part of the key because aware datetimes of the
+    same instant compare equal even when their offsets differ.
+    """
+    return Literal(value, datatype=datatype)
+
+
+def cache_stats() -> collections.Counter:
+    "Return the hits and misses of the literal cache."
+    info = _typed_literal.cache_info()
+    return collections.Counter(literal_cache_hits=info.hits, literal_cache_misses=info.misses)
 
 
 def Boolean(value) -> Literal | NoneLiteral:
@@ -39,3 +68,8 @@ def Integer(value) -> Literal | NoneLiteral:
 def String(value) -> Literal | NoneLiteral:
     "A `Literal` of type `XSD.string`"
     return literal_factory(value, datatype=XSD.string)
+
+
+def WKT(value) -> Literal | NoneLiteral:
+    "A `Literal` of type `GEO.wktLiteral`"
+    return literal_factory(value, datatype=GEO.wktLiteral)
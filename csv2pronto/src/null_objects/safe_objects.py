@@ -1,20 +1,47 @@
+import collections
+import functools
 from urllib.parse import quote
 
 from rdflib import Graph, Literal, Namespace, URIRef
 
 from .. import Node
 
+CACHE_SIZE = 65536
+
 
 class SafeNamespace(Namespace):
-    """Namespace that builds URIs with urllib.parse.quote()"""
+    """
+    Namespace that builds URIs with urllib.parse.quote()
+
+    The last `CACHE_SIZE` terms are interned, so that repeated names
+    share a single `URIRef` and are quoted only once.
+    """
 
+    @functools.lru_cache(maxsize=CACHE_SIZE)
     def term(self, name: str) -> URIRef:
         return super().term(quote(name))
 
 
+def cache_stats() -> collections.Counter:
+    "Return the hits and misses of the term cache."
+    info = SafeNamespace.term.cache_info()
+    return collections.Counter(term_cache_hits=info.hits, term_cache_misses=info.misses)
+
+
 class SafeGraph(Graph):
     """Graph that doesn't add None 'objects'."""
 
     def add(self, triple: tuple[Node, URIRef, Node | Literal]) -> None:
         if all(triple):
             super().add(triple)
+
+
+class SafeTriples(list):
+    """
+    List of triples that, like `SafeGraph`, doesn't add None 'objects',
+    so that it can be filled in place of a graph.
+    """
+
+    def add(self, triple: tuple[Node, URIRef, Node | Literal]) -> None:
+        if all(triple):
+            self.append(triple)
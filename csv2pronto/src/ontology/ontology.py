@@ -0,0 +1,77 @@
+"""Load the ontology, caching the parsed graph by the hash of its file."""
+
+import hashlib
+import os
+import pickle
+
+import rdflib
+from rdflib import Graph
+from rdflib.graph import ReadOnlyGraphAggregate
+
+CACHE_DIR: str = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")), "csv2pronto"
+)
+
+CACHE_VERSION = 1
+"""Version of the format of the cached ontologies."""
+
+
+def load_ontology(path: str, cache_dir: str | None = CACHE_DIR) -> ReadOnlyGraphAggregate:
+    """
+    Return a read-only graph with the ontology at `path`.
+
+    The parsed triples and namespaces are pickled in `cache_dir`, named
+    after the hash of the file, the version of rdflib and
+    `CACHE_VERSION`, so that later runs don't parse it again. A cache
+    that can't be unpickled is replaced by parsing the file again.
+
+    Args:
+        path (str): the ontology file, in any format rdflib can parse.
+        cache_dir (str | None): where to keep the cache, or None to
+            always parse the file.
+    """
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read())
+    # the pickled terms are rdflib objects, which another version may not load
+    digest.update(f"\0rdflib {rdflib.__version__}\0cache {CACHE_VERSION}".encode())
+
+    cache = cache_dir and os.path.join(cache_dir, f"{digest.hexdigest()}.pickle")
+    g: Graph = Graph()
+
+    cached = _load_cache(cache) if cache else None
+    if cached is not None:
+        triples, namespaces = cached
+        for prefix, namespace in namespaces:
+            g.bind(prefix, namespace, replace=True)
+        g.addN((s, p, o, g) for s, p, o in triples)
+        return _read_only(g)
+
+    g.parse(path)
+
+    if cache:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            with open(f"{cache}.tmp", "wb") as f:
+                pickle.dump((list(g), list(g.namespaces())), f)
+            os.replace(f"{cache}.tmp", cache)
+        except OSError:
+            pass  # the cache is only an optimization
+
+    return _read_only(g)
+
+
+def _load_cache(cache: str) -> tuple[list, list] | None:
+    """Return the triples and namespaces pickled in `cache`, or None if it can't be loaded."""
+    try:
+        with open(cache, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        # a missing, truncated or incompatible cache is parsed again and replaced
+        return None
+
+
+def _read_only(g: Graph) -> ReadOnlyGraphAggregate:
+    """Return a read-only view of `g` that keeps its namespaces."""
+    view = ReadOnlyGraphAggregate([g])
+    view.namespace_manager = g.namespace_manager
+    return view
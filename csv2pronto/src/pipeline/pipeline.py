@@ -0,0 +1,183 @@
+"""
+Pipeline that overlaps reading, converting and writing the chunks.
+
+A reader and a writer run in threads of an asyncio loop, and a pool of
+processes converts the chunks in between. The stages are connected by
+bounded queues, so the reader waits when the converters fall behind and
+the converters wait when the writer does. The reader also waits while a
+slow chunk holds back the ones converted after it, so that only a
+bounded number of them wait to be written in order.
+"""
+
+import asyncio
+import collections
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Iterator
+
+from ..converter import convert_chunk, fresh_shared
+from ..incrementals import incrementals
+from ..profiling import profiling
+from ..writers.writers import Writer
+
+STAGES: list[str] = ["read", "convert", "write"]
+
+
+def run_pipeline(
+    chunks: Iterator,
+    first: int,
+    writer: Writer,
+    written: Callable[[int, collections.Counter], None],
+    engine: str = "batch",
+    jobs: int = 1,
+    queue_size: int = 4,
+    profile: bool = False,
+    progress=None,
+    graph: bool = True,
+) -> None:
+    """
+    Convert `chunks` in `jobs` worker processes and write them in order.
+
+    Args:
+        chunks (Iterator): the chunks to convert, the first one being the
+            chunk number `first`.
+        writer (Writer): the writer that dumps the converted chunks.
+        written (Callable): called with the index and the counters of
+            every chunk after it is written.
+        engine (str): the engine used by `convert_chunk`.
+        jobs (int): the number of converter processes (-1 uses every core).
+        queue_size (int): the number of chunks each queue can hold.
+        profile (bool): whether the workers profile their stages.
+        progress (tqdm | None): progress bar updated with every chunk
+            written, showing the queue depths and the throughput of
+            each stage.
+        graph (bool): whether the workers merge the triples of each chunk
+            into a graph.
+    """
+    jobs = os.cpu_count() if jobs < 0 else jobs
+    pipeline = _Pipeline(
+        chunks, first, writer, written, engine, jobs, queue_size, profile, progress, graph
+    )
+    asyncio.run(pipeline.run())
+
+
+class _Pipeline:
+    def __init__(self, chunks, first, writer, written, engine, jobs, queue_size, profile, progress, graph) -> None:
+        self.chunks = chunks
+        self.first = first
+        self.writer = writer
+        self.written = written
+        self.engine = engine
+        self.jobs = jobs
+        self.profile = profile
+        self.progress = progress
+        self.graph = graph
+        self.queue_size = queue_size
+        # busy seconds and rows of each stage
+        self.meter: collections.Counter = collections.Counter()
+
+    async def run(self) -> None:
+        self.read_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        self.write_queue: asyncio.Queue = asyncio.Queue(self.queue_size)
+        # the next chunk to write, notified every time it changes
+        self.next = self.first
+        self.advanced = asyncio.Condition()
+
+        # spawn the workers, as forking a process with running threads is unsafe
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.jobs, mp_context=context) as pool:
+            await asyncio.gather(
+                self.read(),
+                *(self.convert(pool) for _ in range(self.jobs)),
+                self.write(),
+            )
+
+    async def read(self) -> None:
+        """
+        Put the chunks in the read queue, followed by one None per
+        converter.
+
+        At most `queue_size` chunks more than the ones the converters
+        can hold are read before being written, so the chunks waiting
+        for a slow one to be written in order are bounded too.
+        """
+        for idx in itertools.count(self.first):
+            async with self.advanced:
+                await self.advanced.wait_for(lambda: idx < self.next + self.queue_size + self.jobs)
+            start = time.perf_counter()
+            chunk = await asyncio.to_thread(next, self.chunks, None)
+            self.measure("read", start, len(chunk) if chunk is not None else 0)
+            if chunk is None:
+                break
+            await self.read_queue.put((idx, chunk))
+
+        for _ in range(self.jobs):
+            await self.read_queue.put(None)
+
+    async def convert(self, pool: ProcessPoolExecutor) -> None:
+        """Convert the chunks of the read queue, putting them in the write queue."""
+        loop = asyncio.get_running_loop()
+        while (item := await self.read_queue.get()) is not None:
+            idx, chunk = item
+            start = time.perf_counter()
+            result = await loop.run_in_executor(
+                pool, convert_chunk, chunk, idx, self.engine, self.profile,
+                incrementals.settings(), self.graph,
+            )
+            self.measure("convert", start, len(chunk))
+            await self.write_queue.put((idx, result))
+
+        await self.write_queue.put(None)
+
+    async def write(self) -> None:
+        """
+        Write the chunks of the write queue in order, holding the ones
+        converted before the chunks that precede them.
+        """
+        pending: dict[int, tuple] = {}
+        idx, finished = self.first, 0
+        while finished < self.jobs:
+            item = await self.write_queue.get()
+            if item is None:
+                finished += 1
+                continue
+
+            pending[item[0]] = item[1]
+            while idx in pending:
+                triples, shared, chunk_stats = pending.pop(idx)
+                start = time.perf_counter()
+                await asyncio.to_thread(self.writer.write, itertools.chain(fresh_shared(shared), triples))
+                self.measure("write", start, chunk_stats["rows"])
+                self.written(idx, chunk_stats)
+                self.report()
+                idx += 1
+                async with self.advanced:
+                    self.next = idx
+                    self.advanced.notify_all()
+
+    def measure(self, stage: str, start: float, rows: int) -> None:
+        """Add the time since `start` and the `rows` to the meter of `stage`."""
+        seconds = time.perf_counter() - start
+        self.meter[f"{stage}_seconds"] += seconds
+        self.meter[f"{stage}_rows"] += rows
+        if stage != "convert":
+            # the converters profile themselves in the workers
+            profiling.record("serialize" if stage == "write" else stage, seconds)
+
+    def report(self) -> None:
+        """Show the queue depths and the rows per second of each stage."""
+        if self.progress is None:
+            return
+
+        throughput = " ".join(
+            f"{stage} {self.meter[f'{stage}_rows'] / (self.meter[f'{stage}_seconds'] or 1):.0f}"
+            for stage in STAGES
+        )
+        self.progress.update()
+        self.progress.set_postfix_str(
+            f"queues {self.read_queue.qsize()}/{self.queue_size} "
+            f"{self.write_queue.qsize()}/{self.queue_size}, rows/s {throughput}"
+        )
@@ -0,0 +1,188 @@
+"""
+Opt-in profiling of the stages of a conversion.
+
+While enabled, every stage accumulates its wall time, its calls and the
+triples it emitted. Stages can be nested (e.g. `add_real_estate` calls
+`add_feature`), and each one is only charged with its own time and
+triples, so the stages of a run add up to its total.
+"""
+
+import collections
+import contextlib
+import functools
+import json
+import sys
+import time
+from typing import Callable, Iterable
+
+from rdflib import Graph
+
+STAGES: list[str] = [
+    "startup",
+    "import",
+    "read",
+    "parse",
+    "prepare",
+    "add_listing",
+    "add_price",
+    "add_agent",
+    "add_real_estate",
+    "add_address",
+    "add_feature",
+    "add_surface",
+    "add_room",
+    "parse_date",
+    "merge",
+    "serialize",
+]
+"""The stages in the order they are reported."""
+
+_enabled: bool = False
+_stats: collections.Counter = collections.Counter()
+# the stages being timed, as [name, start, children seconds, children triples]
+_stack: list[list] = []
+
+
+def set_profiling(enabled: bool) -> None:
+    "Enable or disable profiling the stages."
+    global _enabled
+    _enabled = enabled
+
+
+def stats() -> collections.Counter:
+    "Return the seconds, calls and triples of each stage, keyed by (stage, measure)."
+    return _stats.copy()
+
+
+def record(name: str, seconds: float) -> None:
+    """
+    Record a call of `name` that took `seconds`, for stages timed before
+    profiling could be enabled (e.g. the startup).
+    """
+    if _enabled:
+        _stats[name, "seconds"] += seconds
+        _stats[name, "calls"] += 1
+
+
+def _enter(name: str) -> None:
+    _stack.append([name, time.perf_counter(), 0.0, 0])
+
+
+def _exit(triples: int | None, calls: int = 1) -> None:
+    """
+    Stop timing the innermost stage, which emitted `triples` including
+    the ones of its children, or None if it doesn't count them.
+    """
+    name, start, child_seconds, child_triples = _stack.pop()
+    seconds = time.perf_counter() - start
+    if triples is None:
+        triples = child_triples
+    _stats[name, "seconds"] += seconds - child_seconds
+    _stats[name, "calls"] += calls
+    _stats[name, "triples"] += triples - child_triples
+    if _stack:
+        _stack[-1][2] += seconds
+        _stack[-1][3] += triples
+
+
+@contextlib.contextmanager
+def stage(name: str, graph: Graph | None = None):
+    """
+    Context manager that profiles its block as `name`, counting the
+    triples added to `graph`.
+    """
+    if not _enabled:
+        yield
+        return
+
+    before = len(graph) if graph is not None else 0
+    _enter(name)
+    try:
+        yield
+    finally:
+        _exit(len(graph) - before if graph is not None else None)
+
+
+def profiled(name: str) -> Callable:
+    """
+    Decorator that profiles every call as `name`. When the first
+    argument is a graph, or a list of triples, the triples added to it
+    are counted.
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+
+            graph = args[0] if args and isinstance(args[0], (Graph, list)) else None
+            before = len(graph) if graph is not None else 0
+            _enter(name)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _exit(len(graph) - before if graph is not None else None)
+
+        return wrapper
+
+    return decorator
+
+
+def profiled_iter(name: str, items: Iterable, triples: bool = True) -> Iterable:
+    """
+    Return `items`, profiling the time spent producing them as `name`.
+    If `items` are `triples`, the ones with a subject and an object are
+    counted.
+    """
+    if not _enabled:
+        return items
+    return _profiled_iter(name, iter(items), triples)
+
+
+def _profiled_iter(name: str, items, triples: bool):
+    calls = 1
+    while True:
+        _enter(name)
+        try:
+            item = next(items)
+        except StopIteration:
+            _exit(0, calls)
+            return
+        except BaseException:
+            _exit(0, calls)
+            raise
+        _exit(1 if triples and item[0] and item[2] else 0, calls)
+        calls = 0
+        yield item
+
+
+def report(stats: collections.Counter) -> dict:
+    "Return the measures of each stage in `stats`, in the order of `STAGES`."
+    names = {key[0] for key in stats if isinstance(key, tuple)}
+    ordered = [s for s in STAGES if s in names] + sorted(names - set(STAGES))
+    return {
+        name: {
+            "seconds": round(stats[name, "seconds"], 6),
+            "calls": stats[name, "calls"],
+            "triples": stats[name, "triples"],
+        }
+        for name in ordered
+    }
+
+
+def dump(stats: collections.Counter, path: str) -> None:
+    "Print a table with the measures of each stage and write them as JSON to `path`."
+    stages = report(stats)
+    total = sum(s["seconds"] for s in stages.values()) or 1
+
+    print(f"{'stage':<16}{'seconds':>10}{'%':>7}{'calls':>10}{'triples':>12}", file=sys.stderr)
+    for name, s in stages.items():
+        print(
+            f"{name:<16}{s['seconds']:>10.3f}{s['seconds'] / total:>7.1%}"
+            f"{s['calls']:>10}{s['triples']:>12}",
+            file=sys.stderr,
+        )
+
+    with open(path, "w") as f:
+        json.dump(stages, f, indent=2)
@@ -0,0 +1,96 @@
+"""Compact records of the listings, parsed once per row."""
+
+from datetime import datetime
+from typing import Callable
+
+from ..dates.dates import parse_date
+from ..faker.faker import Faker
+from ..mapping.mapping import MAPPING
+
+
+def _amount(value: str) -> int | None:
+    """Return the amount of rooms, or None if it isn't a non-negative integer."""
+    return int(value) if value.isdigit() else None
+
+
+SCHEMA: dict[str, Callable[[str], object] | None] = {
+    # anonymized
+    "site": Faker.site,
+    "listing_id": Faker.id,
+    "url": lambda value: None,
+    # dates
+    "date_extracted": parse_date,
+    "date_published": parse_date,
+    "date_ave": parse_date,
+    # kept as they are, as their literals keep the original lexical form
+    **dict.fromkeys([
+        "title", "transaction", "price", "currency", "maintenance_fee",
+        "maintenance_fee_currency", "advertiser_id", "advertiser_name",
+        "property_type", "latitude", "longitude", "province", "district",
+        "neighborhood", "barrio", "address", "direccion", "room_amnt",
+    ]),
+}
+"""The columns the converter reads besides the mapped ones, and how each one is parsed (None keeps the string)."""
+
+
+def _parse(value, parse: Callable[[str], object] | None):
+    """Return `value` parsed by `parse`, or None if it's empty."""
+    if value is None or value == "":
+        return None
+    return value if parse is None else parse(value)
+
+
+class Listing:
+    """
+    The columns of a row that the converter reads, with the empty values
+    as None, the site and id anonymized and the dates parsed to
+    datetimes.
+
+    The columns of the mapping are kept in the order of its plans: the
+    `features` parsed as their datatype says, the `surfaces` as pairs of
+    value and unit, and the `rooms` as amounts.
+
+    Indexing a record (`listing["site"]`) raises a `KeyError` for the
+    missing values, like indexing the row, so the builders can fall back
+    to other URIs.
+    """
+
+    __slots__ = (*SCHEMA, "features", "surfaces", "rooms")
+
+    site: str | None
+    listing_id: str | None
+    date_extracted: datetime | None
+    date_published: datetime | None
+    date_ave: datetime | None
+    features: tuple
+    surfaces: tuple[tuple[str | None, str | None], ...]
+    rooms: tuple[int | None, ...]
+
+    def __init__(self, row: dict) -> None:
+        get = row.get
+        for name, parse in _PARSERS:
+            setattr(self, name, _parse(get(name), parse))
+        self.features = tuple(_parse(get(plan.column), plan.convert) for plan in MAPPING.features)
+        self.surfaces = tuple(
+            (get(plan.column) or None, get(plan.unit_column) or None) for plan in MAPPING.surfaces
+        )
+        self.rooms = tuple(_parse(get(plan.column), _amount) for plan in MAPPING.rooms)
+
+    def __getitem__(self, name: str):
+        value = getattr(self, name)
+        if value is None:
+            raise KeyError(name)
+        return value
+
+
+_PARSERS: list[tuple[str, Callable[[str], object] | None]] = list(SCHEMA.items())
+
+COLUMNS: list[str] = [*SCHEMA, *MAPPING.columns()]
+"""Every column the converter reads; the others can be left unread."""
+
+CATEGORICAL: list[str] = [
+    "site", "province", "district", "property_type", "currency", "transaction",
+    "maintenance_fee_currency",
+    *(plan.unit_column for plan in MAPPING.surfaces),
+]
+"""The low-cardinality columns, that can be read as categories."""
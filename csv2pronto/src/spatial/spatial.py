@@ -0,0 +1,109 @@
+"""
+Coordinates of the listings: their GeoSPARQL WKT literals, and an index
+of the real estates in a uniform grid, to look them up by bounding box
+or radius without reading the graph.
+"""
+
+import math
+import sqlite3
+
+from ..namespaces.namespaces import listing_key
+
+CELL_SIZE: float = 0.01
+"""Size of the cells of the grid of new indexes, in degrees (about 1 km)."""
+
+EARTH_RADIUS = 6_371_000
+"""Mean radius of the Earth, in meters."""
+
+
+def coordinates(latitude, longitude) -> tuple[float, float] | None:
+    """Return the latitude and longitude as floats, or None if they aren't valid."""
+    try:
+        latitude, longitude = float(latitude), float(longitude)
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        return None
+    return latitude, longitude
+
+
+def wkt(latitude, longitude) -> str | None:
+    """Return the WKT point of the coordinates, or None if they aren't valid."""
+    point = coordinates(latitude, longitude)
+    return point and f"POINT({point[1]!r} {point[0]!r})"
+
+
+def distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Return the great-circle distance between two coordinates, in meters."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS * math.asin(math.sqrt(a))
+
+
+class SpatialIndex:
+    """
+    Persistent index, kept in a SQLite database at `path`, of the
+    coordinates of every real estate in the cells of a uniform grid,
+    keyed by its anonymized URI (`real_estate_{site}_{listing_id}`).
+
+    Rows without a listing id or valid coordinates aren't indexed.
+    """
+
+    def __init__(self, path: str) -> None:
+        # chunks are read in the worker threads of the parallel modes
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value REAL)")
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS points ("
+                "uri TEXT PRIMARY KEY, x INTEGER, y INTEGER, latitude REAL, longitude REAL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS cells ON points (x, y)")
+            self.db.execute("INSERT OR IGNORE INTO meta VALUES ('cell_size', ?)", (CELL_SIZE,))
+        (self.cell_size,) = self.db.execute("SELECT value FROM meta WHERE key = 'cell_size'").fetchone()
+
+    def add(self, chunk):
+        """Index the real estates of `chunk` (a DataFrame or a list of rows) and return it."""
+        rows = chunk if isinstance(chunk, list) else chunk.to_dict("records")
+        points = []
+        for row in rows:
+            key = listing_key(row, "real_estate")
+            point = coordinates(row.get("latitude"), row.get("longitude"))
+            if key is not None and point is not None:
+                points.append((key, *self.cell(*point), *point))
+
+        with self.db:
+            self.db.executemany("INSERT OR REPLACE INTO points VALUES (?, ?, ?, ?, ?)", points)
+        return chunk
+
+    def cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        """Return the cell of the coordinates, as its column and row."""
+        return math.floor(longitude / self.cell_size), math.floor(latitude / self.cell_size)
+
+    def bbox(
+        self, min_lat: float, min_lon: float, max_lat: float, max_lon: float
+    ) -> list[tuple[str, float, float]]:
+        """Return the URI, latitude and longitude of the real estates in the bounding box."""
+        (x0, y0), (x1, y1) = self.cell(min_lat, min_lon), self.cell(max_lat, max_lon)
+        return self.db.execute(
+            "SELECT uri, latitude, longitude FROM points "
+            "WHERE x BETWEEN ? AND ? AND y BETWEEN ? AND ? "
+            "AND latitude BETWEEN ? AND ? AND longitude BETWEEN ? AND ?",
+            (x0, x1, y0, y1, min_lat, max_lat, min_lon, max_lon),
+        ).fetchall()
+
+    def radius(self, latitude: float, longitude: float, meters: float) -> list[tuple[str, float]]:
+        """
+        Return the URI and distance of the real estates within `meters` of
+        the coordinates, the closest first.
+        """
+        dlat = math.degrees(meters / EARTH_RADIUS)
+        dlon = dlat / max(math.cos(math.radians(latitude)), 1e-9)
+        found = (
+            (uri, distance(latitude, longitude, lat, lon))
+            for uri, lat, lon in self.bbox(latitude - dlat, longitude - dlon, latitude + dlat, longitude + dlon)
+        )
+        return sorted((item for item in found if item[1] <= meters), key=lambda item: item[1])
+
+    def close(self) -> None:
+        self.db.close()
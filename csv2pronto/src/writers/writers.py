@@ -0,0 +1,564 @@
+"""Writers that dump the converted chunks to the destination file."""
+
+import gzip
+import hashlib
+import heapq
+import json
+import os
+from collections import OrderedDict
+from typing import BinaryIO, Iterable
+
+from rdflib import BNode, Graph, Literal
+from rdflib.plugins.serializers.nt import _nt_row
+from rdflib.plugins.serializers.turtle import TurtleSerializer
+from rdflib.plugins.stores.berkeleydb import has_bsddb
+
+LINE_FORMATS: dict[str, str] = {
+    "nt": "nt",
+    "ntriples": "nt",
+    "nt11": "nt",
+    "nquads": "nquads",
+}
+
+TURTLE_FORMATS: dict[str, str] = {
+    "ttl": "turtle",
+    "turtle": "turtle",
+}
+
+STREAM_FORMATS: set[str] = set(LINE_FORMATS) | set(TURTLE_FORMATS)
+
+STORES: list[str] = ["memory", "berkeleydb", "sorted"]
+
+MERGE_WIDTH = 256
+"""Maximum number of sorted runs merged at once."""
+
+BUFFER_SIZE = 1 << 20
+"""Size of the buffer of the append-only writers."""
+
+COMPRESSIONS: list[str] = ["gzip", "zstd"]
+
+TERM_CACHE_SIZE = 1 << 18
+"""Maximum number of terms whose N-Triples form `NTriplesWriter` remembers."""
+
+SEEN_CACHE_SIZE = 1 << 16
+"""Maximum number of written triples the append-only writers remember."""
+
+
+class Writer:
+    """
+    Base class for the writers of the converted chunks.
+
+    `triples` counts the triples of the chunks that the writer emitted,
+    leaving out the ones of the first graph and the ones it had already
+    written. It is final once the writer is closed.
+    """
+
+    triples = 0
+
+    def write(self, chunk: Iterable) -> None:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def written(self, rows: int) -> None:
+        """Record that the last chunk written had `rows` rows."""
+
+    def state(self) -> dict:
+        """
+        Return what the writer needs to resume appending to the
+        destination after the last chunk written.
+        """
+        return {}
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+class GraphWriter(Writer):
+    """
+    Writer that accumulates every chunk in `graph` and serializes the
+    whole graph to `destination`.
+
+    A graph in memory is re-serialized after each chunk. When resuming,
+    the graph is replaced by the one written so far to `destination`,
+    which already holds the triples of `graph`.
+
+    A graph in a `persistent` store is only committed after each chunk,
+    and serialized once when the writer is closed. Turtle is then
+    written as its N-Triples subset, one triple per line, as rdflib's
+    Turtle serializer would load the whole graph into memory.
+    """
+
+    def __init__(
+        self, graph: Graph, destination: str, format: str, resume: dict | None = None,
+        persistent: bool = False,
+    ) -> None:
+        self.graph = graph
+        self.destination = destination
+        self.format = format
+        self.persistent = persistent
+        if resume is not None:
+            if persistent:
+                raise ValueError("Persistent stores can't be resumed")
+            self.graph.remove((None, None, None))
+            self.graph.parse(destination, format=format)
+        self.first = len(self.graph)
+
+    def write(self, chunk: Iterable) -> None:
+        """Merge `chunk` into the graph and serialize it, unless it is persistent."""
+        self.graph += chunk
+        self.graph.commit()
+        if not self.persistent:
+            self.serialize()
+
+    def serialize(self) -> None:
+        """Serialize the whole graph to `destination`."""
+        # serialize to a temporary file so an interrupted run never
+        # leaves a truncated destination behind
+        if self.persistent and self.format in TURTLE_FORMATS:
+            with open(f"{self.destination}.tmp", "wb", buffering=BUFFER_SIZE) as f:
+                for triple in self.graph:
+                    f.write(_nt_row(triple).encode())
+        else:
+            self.graph.serialize(f"{self.destination}.tmp", format=self.format, encoding="utf-8")
+        os.replace(f"{self.destination}.tmp", self.destination)
+
+    def close(self) -> None:
+        if self.persistent:
+            self.serialize()
+        self.triples = len(self.graph) - self.first
+        self.graph.close(commit_pending_transaction=True)
+
+
+class StreamWriter(Writer):
+    """
+    Base class for append-only writers.
+
+    The triples of `graph` (usually the ontology) are written once when
+    the writer is created, and every chunk only writes the triples that
+    were not written recently. The triples shared by many rows (axioms,
+    locations, sites and agents) are already written once by the
+    converter, so the writer only remembers the last `SEEN_CACHE_SIZE`
+    triples, to drop the ones repeated within a chunk or by nearby
+    chunks, and its memory doesn't grow with the output. The triples of
+    a listing repeated further apart in the source are written again.
+    Triples with blank nodes are always new, as each row creates its own
+    blank nodes, so only the remaining ones are remembered.
+
+    When resuming, whatever was written after the last saved state is
+    truncated and the writer keeps appending to `destination`.
+    """
+
+    def __init__(self, graph: Graph, destination: str, format: str, resume: dict | None = None) -> None:
+        self.format = format
+        self.seen: OrderedDict = OrderedDict()
+        if resume is None:
+            self.file: BinaryIO = self.open(destination)
+            self.write(graph)
+            self.triples = 0
+        else:
+            self.file = open(destination, "r+b", buffering=BUFFER_SIZE)
+            self.file.truncate(resume["size"])
+            self.file.seek(resume["size"])
+            self.restore(resume)
+
+    def open(self, destination: str) -> BinaryIO:
+        """Open `destination` to write it from the start."""
+        return open(destination, "wb", buffering=BUFFER_SIZE)
+
+    def fresh(self, chunk: Iterable) -> Iterable:
+        """Yield the triples of `chunk` that were not written recently."""
+        seen = self.seen
+        for triple in chunk:
+            if not any(isinstance(t, BNode) for t in triple):
+                if triple in seen:
+                    seen.move_to_end(triple)
+                    continue
+                seen[triple] = None
+                if len(seen) > SEEN_CACHE_SIZE:
+                    seen.popitem(last=False)
+            yield triple
+
+    def restore(self, state: dict) -> None:
+        """Restore what was saved in `state` when resuming."""
+
+    def flush(self) -> None:
+        self.file.flush()
+
+    def state(self) -> dict:
+        return {"size": self.file.tell()}
+
+    def close(self) -> None:
+        self.file.close()
+
+
+class LineWriter(StreamWriter):
+    """
+    Append-only writer for N-Triples and N-Quads.
+
+    The resulting file holds the same triples as a full serialization
+    of the cumulative graph, though some may be written more than once
+    (see `StreamWriter`). Quads are written to the default graph.
+    """
+
+    def write(self, chunk: Iterable) -> None:
+        rows = [_nt_row(triple) for triple in self.fresh(chunk)]
+        self.file.write("".join(rows).encode())
+        self.triples += len(rows)
+
+    def close(self) -> None:
+        if self.format == "nquads":
+            self.file.write(b"\n")
+        super().close()
+
+
+class NTriplesWriter(LineWriter):
+    """
+    Append-only writer for N-Triples that formats the terms itself
+    instead of through rdflib, so the chunks can be written as they are
+    converted without building a graph (see `iter_chunk_triples`).
+
+    The output can be compressed with gzip or zstd, in which case it
+    can't be resumed.
+    """
+
+    def __init__(
+        self, graph: Graph, destination: str, format: str, resume: dict | None = None,
+        compression: str | None = None,
+    ) -> None:
+        if compression and resume is not None:
+            raise ValueError("Compressed outputs can't be resumed")
+        self.compression = compression
+        self.raw: BinaryIO | None = None
+        self.terms: dict = {}
+        self.lines = 0
+        super().__init__(graph, destination, format, resume)
+
+    def open(self, destination: str) -> BinaryIO:
+        file = self.raw = super().open(destination)
+        if self.compression == "gzip":
+            return gzip.GzipFile(fileobj=file, mode="wb", compresslevel=6)
+        if self.compression == "zstd":
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("--compression zstd needs the zstandard package")
+            return zstandard.ZstdCompressor().stream_writer(file)
+        return file
+
+    def write(self, chunk: Iterable) -> None:
+        term = self.term
+        lines = [f"{term(s)} {term(p)} {term(o)} .\n" for s, p, o in self.fresh(chunk)]
+        self.file.write("".join(lines).encode())
+        self.lines += len(lines)
+        self.triples += len(lines)
+
+    def term(self, t) -> str:
+        """Return the N-Triples form of the term `t`, as `_nt_row` writes it."""
+        if isinstance(t, BNode):
+            return f"_:{t}"
+        try:
+            return self.terms[t]
+        except KeyError:
+            pass
+
+        if isinstance(t, Literal):
+            n3 = _quote(t)
+            if t.language:
+                n3 += f"@{t.language}"
+            elif t.datatype:
+                n3 += f"^^<{t.datatype}>"
+        else:
+            n3 = f"<{t}>"
+
+        if len(self.terms) >= TERM_CACHE_SIZE:
+            self.terms.clear()
+        self.terms[t] = n3
+        return n3
+
+    def close(self) -> None:
+        super().close()
+        if self.raw:
+            # closing a gzip stream leaves its file open
+            self.raw.close()
+
+
+class ShardedWriter(NTriplesWriter):
+    """
+    Native N-Triples writer that splits the output into shards named
+    after `destination` (`out.nt.gz` is split into `out-00001.nt.gz`,
+    `out-00002.nt.gz`...), along the boundaries of the chunks.
+
+    A shard is finished after the chunk that makes it reach `max_rows`
+    rows or `max_bytes` bytes, and the shards finished so far are listed
+    in `destination.manifest.json` with their rows, triples and sha256,
+    so they can be loaded and retried independently. Every triple is
+    written to a single shard, and the ontology to the first one.
+    """
+
+    def __init__(
+        self, graph: Graph, destination: str, format: str, compression: str | None = None,
+        max_rows: int | None = None, max_bytes: int | None = None,
+    ) -> None:
+        self.destination = destination
+        self.max_rows, self.max_bytes = max_rows, max_bytes
+        self.shards: list[dict] = []
+        self.shard: dict = {}
+        self.rows = 0
+        self.full = False
+        super().__init__(graph, destination, format, None, compression)
+
+    def open(self, destination: str) -> BinaryIO:
+        path = shard_path(self.destination, len(self.shards) + 1)
+        self.shard = {
+            "path": os.path.basename(path), "first_row": self.rows, "rows": 0, "chunks": 0,
+            "first_line": self.lines,
+        }
+        return super().open(path)
+
+    def write(self, chunk: Iterable) -> None:
+        if self.full:
+            self.finish()
+            self.file = self.open(self.destination)
+            self.full = False
+        super().write(chunk)
+
+    def written(self, rows: int) -> None:
+        """Count the rows of the shard, finishing it once it is full."""
+        self.rows += rows
+        self.shard["rows"] += rows
+        self.shard["chunks"] += 1
+        self.full = (self.max_rows is not None and self.shard["rows"] >= self.max_rows) or (
+            self.max_bytes is not None and self.raw.tell() >= self.max_bytes
+        )
+
+    def finish(self) -> None:
+        """Close the current shard and add it to the manifest."""
+        self.file.close()
+        self.raw.close()
+
+        path = os.path.join(os.path.dirname(self.destination), self.shard["path"])
+        sha256 = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(BUFFER_SIZE), b""):
+                sha256.update(block)
+
+        first_line = self.shard.pop("first_line")
+        self.shard.update(
+            triples=self.lines - first_line, bytes=os.path.getsize(path), sha256=sha256.hexdigest()
+        )
+        self.shards.append(self.shard)
+
+        manifest = f"{self.destination}.manifest.json"
+        with open(f"{manifest}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"compression": self.compression, "shards": self.shards}, f, indent=2)
+        os.replace(f"{manifest}.tmp", manifest)
+
+    def close(self) -> None:
+        self.finish()
+
+
+def shard_path(destination: str, n: int) -> str:
+    """Return the path of the shard number `n` of `destination`."""
+    directory, name = os.path.split(destination)
+    stem, dot, suffix = name.partition(".")
+    return os.path.join(directory, f"{stem}-{n:05}{dot}{suffix}")
+
+
+def _quote(value: str) -> str:
+    """Return `value` quoted and escaped as an N-Triples string."""
+    return '"%s"' % value.replace("\\", "\\\\").replace("\n", "\\n").replace(
+        '"', '\\"'
+    ).replace("\r", "\\r")
+
+
+class _ChunkTurtleSerializer(TurtleSerializer):
+    """
+    Turtle serializer that only writes the prefixes that are not in
+    `emitted`, so that consecutive chunks can share a single header.
+    """
+
+    def __init__(self, store: Graph, emitted: dict[str, str]) -> None:
+        super().__init__(store)
+        self.emitted = emitted
+
+    def startDocument(self) -> None:
+        self._started = True
+        for prefix, uri in sorted(self.namespaces.items()):
+            if self.emitted.get(prefix) != uri:
+                self.write(self.indent() + "@prefix %s: <%s> .\n" % (prefix, uri))
+                self.emitted[prefix] = uri
+
+
+class TurtleWriter(StreamWriter):
+    """
+    Append-only writer for Turtle.
+
+    Every chunk is serialized on its own with the namespace manager of
+    the first graph, and each prefix is declared only the first time it
+    is used.
+    """
+
+    def __init__(self, graph: Graph, destination: str, format: str, resume: dict | None = None) -> None:
+        self.namespace_manager = graph.namespace_manager
+        self.emitted: dict[str, str] = {}
+        super().__init__(graph, destination, format, resume)
+
+    def write(self, chunk: Iterable) -> None:
+        g = Graph(namespace_manager=self.namespace_manager)
+        for triple in self.fresh(chunk):
+            g.add(triple)
+        self.triples += len(g)
+        if len(g):
+            _ChunkTurtleSerializer(g, self.emitted).serialize(self.file, encoding="utf-8")
+
+    def restore(self, state: dict) -> None:
+        """Remember the prefixes already declared in the destination."""
+        self.emitted.update(state["prefixes"])
+
+    def state(self) -> dict:
+        return {**super().state(), "prefixes": self.emitted}
+
+
+class SortedLineWriter(Writer):
+    """
+    Writer for N-Triples and N-Quads that keeps at most one chunk in
+    memory.
+
+    Each chunk is written to `directory` as a sorted run of distinct
+    lines, and the runs are merged into `destination` when the writer is
+    closed, dropping repeated lines. The output is sorted instead of
+    following the order of the rows.
+    """
+
+    def __init__(self, graph: Graph, destination: str, format: str, directory: str) -> None:
+        self.destination = destination
+        self.format = format
+        self.directory = directory
+        self.runs: list[str] = []
+        self.created = 0
+        self.write(graph)
+        self.first = len(graph)
+
+    def write(self, chunk: Iterable) -> None:
+        lines = sorted({_nt_row(triple).encode() for triple in chunk})
+        path = self._run()
+        with open(path, "wb") as f:
+            f.writelines(lines)
+        self.runs.append(path)
+
+        if len(self.runs) >= MERGE_WIDTH:
+            path = self._run()
+            _merge(self.runs, path)
+            self.runs = [path]
+
+    def close(self) -> None:
+        self.triples = _merge(self.runs, self.destination) - self.first
+        if self.format == "nquads":
+            with open(self.destination, "ab") as f:
+                f.write(b"\n")
+        self.runs = []
+
+    def _run(self) -> str:
+        """Return the path of a new run."""
+        self.created += 1
+        return os.path.join(self.directory, f"run-{self.created:06}.nt")
+
+
+def _merge(runs: list[str], destination: str) -> int:
+    """
+    Merge the sorted `runs` into `destination`, removing them, and return
+    the number of lines written.
+    """
+    files = [open(run, "rb") for run in runs]
+    lines = 0
+    try:
+        with open(destination, "wb") as out:
+            last = None
+            for line in heapq.merge(*files):
+                if line != last:
+                    out.write(line)
+                    last = line
+                    lines += 1
+    finally:
+        for f in files:
+            f.close()
+        for run in runs:
+            os.remove(run)
+    return lines
+
+
+def open_graph(store: str, directory: str) -> Graph:
+    """
+    Return the graph where the chunks are accumulated, which is kept in
+    a BerkeleyDB store inside `directory` when `store` is "berkeleydb",
+    and in memory otherwise.
+    """
+    if store != "berkeleydb":
+        return Graph()
+    if not has_bsddb:
+        raise ImportError("--store berkeleydb needs the berkeleydb package")
+    graph = Graph(store="BerkeleyDB")
+    graph.open(os.path.join(directory, "graph.db"), create=True)
+    return graph
+
+
+def writer_factory(
+    graph: Graph,
+    destination: str,
+    format: str,
+    stream: bool = False,
+    store: str = "memory",
+    directory: str | None = None,
+    resume: dict | None = None,
+    native: bool = False,
+    compression: str | None = None,
+    shard_rows: int | None = None,
+    shard_bytes: int | None = None,
+) -> Writer:
+    """
+    Return the writer for `format`. Unless `stream` is set or `store` is
+    "sorted", the whole graph is serialized after every chunk, or once at
+    the end if `store` is "berkeleydb".
+
+    Args:
+        graph (Graph): the graph written first, usually with the ontology.
+        destination (str): the file to write.
+        format (str): the RDF format of the output.
+        stream (bool): whether to append only the new triples of each chunk.
+        store (str): one of `STORES`.
+        directory (str | None): where the sorted runs are kept.
+        resume (dict | None): the state of a previous writer to resume.
+        native (bool): whether to format N-Triples without rdflib.
+        compression (str | None): one of `COMPRESSIONS`, for native writers.
+        shard_rows (int | None): the rows of each shard of a native writer.
+        shard_bytes (int | None): the bytes of each shard of a native writer.
+    """
+    if native:
+        if LINE_FORMATS.get(format) != "nt":
+            raise ValueError(f"Format {format} can't be written natively")
+        if shard_rows or shard_bytes:
+            if resume is not None:
+                raise ValueError("Sharded outputs can't be resumed")
+            return ShardedWriter(graph, destination, "nt", compression, shard_rows, shard_bytes)
+        return NTriplesWriter(graph, destination, "nt", resume, compression)
+    if store == "sorted":
+        if format not in LINE_FORMATS:
+            raise ValueError(f"Format {format} can't be sorted")
+        if resume is not None:
+            raise ValueError("Sorted runs can't be resumed")
+        return SortedLineWriter(graph, destination, LINE_FORMATS[format], directory)
+    if not stream:
+        return GraphWriter(graph, destination, format, resume, store == "berkeleydb")
+    if format in LINE_FORMATS:
+        return LineWriter(graph, destination, LINE_FORMATS[format], resume)
+    if format in TURTLE_FORMATS:
+        return TurtleWriter(graph, destination, TURTLE_FORMATS[format], resume)
+    raise ValueError(f"Format {format} can't be streamed")
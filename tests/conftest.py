@@ -0,0 +1,70 @@
+import collections
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+CSV2PRONTO = os.path.join(ROOT, "csv2pronto")
+ONTOLOGY = os.path.join(ROOT, "ontology", "pronto.owl")
+
+# the converter is run as `python csv2pronto`, which imports its modules as `src`
+sys.path.insert(0, CSV2PRONTO)
+sys.path.insert(0, os.path.join(ROOT, "benchmark"))
+
+# runs the converter, failing before writing the chunk number `fail_at`
+# (the first argument) when it isn't negative
+RUN = """
+import runpy, sys
+sys.path.insert(0, {csv2pronto!r})
+import src.converter as converter
+
+fail_at, sys.argv = int(sys.argv[1]), ["csv2pronto"] + sys.argv[2:]
+calls = 0
+
+def failing(convert):
+    def wrapper(*args, **kwargs):
+        global calls
+        calls += 1
+        if calls > fail_at >= 0:
+            raise SystemExit("interrupted")
+        return convert(*args, **kwargs)
+    return wrapper
+
+converter.write_chunk = failing(converter.write_chunk)
+converter.create_graph_from_chunk = failing(converter.create_graph_from_chunk)
+runpy.run_path({main!r}, run_name="__main__")
+"""
+
+
+def convert(source, destination, *args: str, fail_at: int = -1) -> subprocess.CompletedProcess:
+    """
+    Convert `source` to the N-Triples `destination` in a new process,
+    interrupting it before the chunk number `fail_at` if given.
+    """
+    code = RUN.format(csv2pronto=CSV2PRONTO, main=os.path.join(CSV2PRONTO, "__main__.py"))
+    return subprocess.run(
+        [
+            sys.executable, "-c", code, str(fail_at), "-s", str(source), "-d", str(destination),
+            "-o", ONTOLOGY, "-f", "nt", "--no-ontology-cache", *args,
+        ],
+        capture_output=True, text=True, check=fail_at < 0,
+    )
+
+
+def lines(path) -> collections.Counter:
+    """Return the lines of the N-Triples file at `path`, with the blank nodes renamed to _:b."""
+    with open(path, encoding="utf-8") as f:
+        return collections.Counter(re.sub(r"_:\w+", "_:b", line) for line in f)
+
+
+@pytest.fixture(scope="session")
+def listings(tmp_path_factory):
+    """A CSV of 250 synthetic listings."""
+    from generate_listings import generate
+
+    path = tmp_path_factory.mktemp("listings") / "listings.csv"
+    generate(250, str(path), seed=1)
+    return path
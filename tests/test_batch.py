@@ -0,0 +1,34 @@
+import collections
+import csv
+import re
+
+from conftest import convert, lines
+
+
+def test_row_and_batch_engines_make_the_same_graph(tmp_path, listings):
+    with open(listings, newline="", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        fields, rows = reader.fieldnames, list(reader)
+    for i, row in enumerate(rows):
+        # the second chunk has no listing ids at all
+        if 100 <= i < 200:
+            row["listing_id"] = ""
+        if i % 7 == 0:
+            row["province"] = row["district"] = row["neighborhood"] = row["barrio"] = ""
+    source = tmp_path / "source.csv"
+    with open(source, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    outputs = {}
+    for engine in ["row", "batch"]:
+        destination = tmp_path / f"{engine}.nt"
+        convert(source, destination, "--engine", engine, "--chunksize", "100")
+        # each run makes the fallback fragments with its own timestamp
+        outputs[engine] = collections.Counter(
+            re.sub(r"_\d{13,}_", "_T_", line) for line in lines(destination).elements()
+        )
+
+    assert any("_T_" in line for line in outputs["row"])
+    assert outputs["batch"] == outputs["row"]
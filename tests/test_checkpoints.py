@@ -0,0 +1,61 @@
+import csv
+import re
+
+import pytest
+
+from conftest import convert, lines
+from src.checkpoints.checkpoints import RecordOffsets
+
+
+def test_record_offsets_skip_multiline_records_and_blank_lines(tmp_path):
+    source = tmp_path / "source.csv"
+    source.write_bytes(b'a,b\r\n1,"two\r\n\r\nlines"\r\n\r\n\r\n2,x\r\n3,y\r\n')
+    offsets = RecordOffsets(str(source))
+    offset = offsets.skip(2)
+    offsets.close()
+    assert source.read_bytes()[offset:] == b"3,y\r\n"
+
+
+@pytest.mark.parametrize("engine", ["row", "batch"])
+@pytest.mark.parametrize("blank_lines", [False, True])
+def test_resumed_run_matches_full_run(tmp_path, listings, engine, blank_lines):
+    source = tmp_path / "source.csv"
+    rows = listings.read_bytes().split(b"\r\n")
+    if blank_lines:
+        # a blank line in the first chunk and another one in the second
+        rows.insert(30, b"")
+        rows.insert(140, b"")
+    source.write_bytes(b"\r\n".join(rows))
+
+    options = ["--engine", engine, "--chunksize", "100", "--fallback-ids", "counter", "--run-id", "test"]
+    convert(source, tmp_path / "full.nt", *options)
+
+    resumed = tmp_path / "resumed.nt"
+    interrupted = convert(source, resumed, "--checkpoint", *options, fail_at=2)
+    assert interrupted.returncode != 0
+    assert (tmp_path / "resumed.nt.checkpoint.json").exists()
+    convert(source, resumed, "--resume", *options)
+
+    assert lines(resumed) == lines(tmp_path / "full.nt")
+
+
+def summary_triples(result) -> int:
+    return int(re.search(r"into (\d+) triples", result.stderr)[1])
+
+
+@pytest.mark.parametrize("format", ["nt", "ttl"])
+def test_resumed_stream_doesnt_repeat_shared_triples(tmp_path, listings, format):
+    # the first two chunks on their own, to count the triples of the last one
+    head = tmp_path / "head.csv"
+    with open(listings, newline="", encoding="utf-8") as f:
+        rows = [row for _, row in zip(range(201), csv.reader(f))]
+    with open(head, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows(rows)
+
+    options = ["--stream", "-f", format, "--chunksize", "100", "--fallback-ids", "counter", "--run-id", "test"]
+    full = summary_triples(convert(listings, tmp_path / f"full.{format}", *options))
+    first = summary_triples(convert(head, tmp_path / f"head.{format}", *options))
+
+    resumed = tmp_path / f"resumed.{format}"
+    convert(listings, resumed, "--checkpoint", *options, fail_at=2)
+    assert summary_triples(convert(listings, resumed, "--resume", *options)) == full - first
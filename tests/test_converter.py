@@ -0,0 +1,45 @@
+import csv
+
+import pytest
+from rdflib import BNode, RDFS
+
+from src.converter import create_graph, iter_triples
+from src.incrementals import incrementals
+
+
+@pytest.fixture(autouse=True)
+def hash_ids():
+    """Make the fallback URIs of the listings without an id the same in every call."""
+    settings = incrementals.settings()
+    incrementals.configure("hash")
+    yield
+    incrementals.configure(**settings)
+
+
+def rows(path, n):
+    with open(path, encoding="utf-8") as f:
+        return [row for _, row in zip(range(n), csv.DictReader(f))]
+
+
+def named(triples):
+    return {t for t in triples if not any(isinstance(term, BNode) for term in t)}
+
+
+def test_each_create_graph_is_complete(listings):
+    first, second = rows(listings, 2)
+    g = create_graph(first)
+    create_graph(second)
+    again = create_graph(first)
+
+    assert any(again.triples((None, RDFS.subClassOf, None)))
+    assert len(again) == len(g)
+    assert named(again) == named(g)
+
+
+def test_each_iter_triples_is_complete(listings):
+    first = named(iter_triples(rows(listings, 20)))
+    named(iter_triples(rows(listings, 40)))
+    again = named(iter_triples(rows(listings, 20)))
+
+    assert any(p == RDFS.subClassOf for _, p, _ in again)
+    assert again == first
@@ -0,0 +1,33 @@
+import pytest
+
+from conftest import convert, lines
+from src.incrementals import incrementals
+
+
+@pytest.mark.parametrize(
+    "options, fragment",
+    [
+        (["--fallback-ids", "counter", "--run-id", "Run-2024_10"], "pronto.owl#listing_Run-2024_10_"),
+        (["--fallback-ids", "hash"], "pronto.owl#listing_"),
+    ],
+)
+def test_engines_make_the_same_fallback_uris(tmp_path, listings, options, fragment):
+    outputs = {}
+    for name, engine_options in {
+        "row": ["--engine", "row"],
+        "batch": ["--engine", "batch"],
+        "batch-jobs": ["--engine", "batch", "--jobs", "2"],
+    }.items():
+        outputs[name] = tmp_path / f"{name}.nt"
+        convert(listings, outputs[name], "--chunksize", "100", *engine_options, *options)
+
+    row = lines(outputs["row"])
+    assert any(fragment in line for line in row)
+    assert lines(outputs["batch"]) == row
+    assert lines(outputs["batch-jobs"]) == row
+
+
+@pytest.mark.parametrize("run_id", ["a b", "a/b", "ñ", "a%20b"])
+def test_run_ids_that_need_quoting_are_rejected(run_id):
+    with pytest.raises(ValueError):
+        incrementals.configure("counter", run_id)
@@ -0,0 +1,18 @@
+from rdflib.namespace import RDF
+
+from src.converter import iter_triples
+from src.namespaces.namespaces import listing_key
+
+
+def test_listing_key_matches_the_converted_uris():
+    row = {"site": "mercadolibre", "listing_id": "ML123", "property_type": "casa"}
+    subjects = {str(s) for s, p, o in iter_triples([row]) if p == RDF.type}
+
+    assert listing_key(row) in subjects
+    assert listing_key(row, "real_estate") in subjects
+    assert listing_key(row).endswith("#listing_site2_123")
+
+
+def test_listing_key_needs_a_site_and_an_id():
+    assert listing_key({"site": "argenprop", "listing_id": ""}) is None
+    assert listing_key({"site": "", "listing_id": "1"}) is None
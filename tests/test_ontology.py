@@ -0,0 +1,26 @@
+import os
+
+import rdflib
+
+from conftest import ONTOLOGY
+from src.ontology import ontology
+from src.ontology.ontology import load_ontology
+
+
+def test_cache_is_keyed_by_the_rdflib_version(tmp_path, monkeypatch):
+    load_ontology(ONTOLOGY, str(tmp_path))
+    monkeypatch.setattr(rdflib, "__version__", "0.0.0")
+    load_ontology(ONTOLOGY, str(tmp_path))
+    monkeypatch.setattr(ontology, "CACHE_VERSION", ontology.CACHE_VERSION + 1)
+    load_ontology(ONTOLOGY, str(tmp_path))
+
+    assert len(os.listdir(tmp_path)) == 3
+
+
+def test_unreadable_cache_is_parsed_again(tmp_path):
+    expected = len(load_ontology(ONTOLOGY, str(tmp_path)))
+    [cache] = tmp_path.iterdir()
+    cache.write_bytes(b"not a pickle")
+
+    assert len(load_ontology(ONTOLOGY, str(tmp_path))) == expected
+    assert len(load_ontology(ONTOLOGY, str(tmp_path))) == expected
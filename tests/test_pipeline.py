@@ -0,0 +1,34 @@
+import csv
+
+from src.pipeline.pipeline import run_pipeline
+from src.writers.writers import Writer
+
+
+class CountingWriter(Writer):
+    def __init__(self) -> None:
+        self.chunks = 0
+
+    def write(self, chunk) -> None:
+        list(chunk)
+        self.chunks += 1
+
+
+def test_a_slow_chunk_doesnt_let_the_others_pile_up(listings):
+    with open(listings, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    # the first chunk takes much longer to convert than the others
+    chunks = [rows[:200]] + [rows[i : i + 1] for i in range(200, 250)]
+
+    writer = CountingWriter()
+    in_flight = []
+
+    def read():
+        for idx, chunk in enumerate(chunks):
+            in_flight.append(idx - writer.chunks)
+            yield chunk
+
+    jobs, queue_size = 2, 2
+    run_pipeline(read(), 0, writer, lambda idx, stats: None, "row", jobs, queue_size)
+
+    assert writer.chunks == len(chunks)
+    assert max(in_flight) <= queue_size + jobs
@@ -0,0 +1,127 @@
+import csv
+import re
+from datetime import datetime
+
+import pytest
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.compare import isomorphic
+from rdflib.namespace import XSD
+
+from conftest import convert
+from src.converter import create_graph
+from src.incrementals import incrementals
+from src.writers import writers
+from src.writers.writers import GraphWriter, LineWriter, NTriplesWriter
+
+EX = "http://example.org/"
+
+
+def sample_graph() -> Graph:
+    g = Graph()
+    s, p = URIRef(EX + "s"), URIRef(EX + "p")
+    for value in [
+        Literal('say "hi"'),
+        Literal("back\\slash"),
+        Literal("two\nlines\r\nand\ta tab"),
+        Literal("Ñandú, São Paulo, 東京"),
+        Literal("emoji 🏠"),
+        Literal("plain string", datatype=XSD.string),
+        Literal(datetime(2024, 8, 1, 12, 30)),
+        Literal("2024-08-01", datatype=XSD.date),
+        Literal(3.5),
+        Literal(1e-7, datatype=XSD.double),
+        Literal("12.50", datatype=XSD.float),
+        Literal(42),
+        Literal(True),
+        Literal("casa", lang="es"),
+        Literal("house", lang="en-GB"),
+        URIRef(EX + "o%20with%20spaces"),
+    ]:
+        g.add((s, p, value))
+    g.add((BNode("b1"), p, s))
+    return g
+
+
+def test_native_writer_matches_rdflib(tmp_path):
+    g = sample_graph()
+    destination = tmp_path / "out.nt"
+    with NTriplesWriter(Graph(), str(destination), "nt") as writer:
+        writer.write(g)
+
+    expected = g.serialize(format="nt", encoding="utf-8").decode("utf-8")
+    assert sorted(destination.read_text("utf-8").splitlines()) == sorted(
+        line for line in expected.splitlines() if line
+    )
+
+
+def test_native_writer_drops_repeated_triples(tmp_path):
+    g = sample_graph()
+    destination = tmp_path / "out.nt"
+    with NTriplesWriter(Graph(), str(destination), "nt") as writer:
+        writer.write(g)
+        writer.write(g)
+
+    lines = [line for line in destination.read_text("utf-8").splitlines() if "_:" not in line]
+    assert len(lines) == len(set(lines)) == len(g) - 1
+
+
+def test_native_writer_memory_is_bounded(tmp_path, monkeypatch):
+    monkeypatch.setattr(writers, "SEEN_CACHE_SIZE", 100)
+    p = URIRef(EX + "p")
+    with NTriplesWriter(Graph(), str(tmp_path / "out.nt"), "nt") as writer:
+        writer.write((URIRef(f"{EX}s{i}"), p, Literal(i)) for i in range(1000))
+        assert len(writer.seen) == 100
+        assert writer.lines == 1000
+
+
+def test_listing_repeated_beyond_the_cache_keeps_the_same_triples(tmp_path, listings, monkeypatch):
+    monkeypatch.setattr(writers, "SEEN_CACHE_SIZE", 1000)
+    settings = incrementals.settings()
+    incrementals.configure("hash")
+    try:
+        with open(listings, encoding="utf-8") as f:
+            rows = [row for _, row in zip(range(30), csv.DictReader(f))]
+        # the first listing again, after far more triples than the writer remembers
+        graphs = [create_graph(row) for row in rows + rows[:1]]
+    finally:
+        incrementals.configure(**settings)
+
+    destination = tmp_path / "out.nt"
+    with LineWriter(Graph(), str(destination), "nt") as writer:
+        for g in graphs:
+            writer.write(g)
+
+    full = Graph()
+    for g in graphs:
+        full += g
+    written = destination.read_text("utf-8").splitlines()
+    # the repeated listing is written again, as documented in `StreamWriter`
+    assert len(written) > len(set(written))
+    assert set(written) == set(full.serialize(format="nt").splitlines()) - {""}
+    assert writer.triples == len(written)
+
+
+def test_persistent_graph_is_serialized_once(tmp_path):
+    g = sample_graph()
+    destination = tmp_path / "out.ttl"
+    with GraphWriter(Graph(), str(destination), "turtle", persistent=True) as writer:
+        writer.write(g)
+        writer.write(g)
+        assert not destination.exists()
+
+    written = Graph().parse(destination, format="turtle")
+    assert isomorphic(written, g)
+
+
+@pytest.mark.parametrize(
+    "options",
+    [[], ["--stream"], ["--native"], ["--stream", "--jobs", "2"], ["--native", "--pipeline"],
+     ["--store", "sorted"]],
+)
+def test_summary_counts_the_triples_written(tmp_path, listings, options):
+    destination = tmp_path / "out.nt"
+    result = convert(listings, destination, "--chunksize", "50", "--no-ontology-output", *options)
+
+    # the locations, sites and agents are shared by the rows of many chunks
+    triples = int(re.search(r"into (\d+) triples", result.stderr)[1])
+    assert triples == len(destination.read_text("utf-8").splitlines())